@@ -4,9 +4,65 @@ from bs4 import BeautifulSoup
 import pandas as pd
 import numpy as np
 import re
-import io
-from urllib.parse import urljoin, urlparse
-import trafilatura
+import os
+import codecs
+import atexit
+import bisect
+import functools
+import hashlib
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from dateutil.tz import tzlocal
+from html.parser import HTMLParser
+from urllib.parse import urlparse
+
+from exports import EXPORT_FORMATS, available_formats, export_bytes
+from http_client import HTTP_FETCH_BYTES, PARSE_RESULTS, get_http_client, read_capped
+from metrics import counter, gauge, histogram, serve_metrics
+from numeric import LOCALES, parse_numbers
+from online_stats import OnlineStats
+from price_api import PriceApi, serve_price_api
+from price_cache import SnapshotCache, SnapshotFile
+from price_history import PriceHistory
+from price_sources import consensus_rate, get_adapters, release_soup, valid_rate
+from resilience import get_source
+from singleflight import get_flight
+from pricing import get_pricing_engine
+
+# Altın fiyatlarının ne kadar süre taze sayılacağı (saniye)
+GOLD_PRICE_TTL = float(os.environ.get('GOLD_PRICE_TTL', '30'))
+
+# Kaynak çağrıları için gecikme bütçesi (sn), yavaş isteğe paralel ikinci istek eşiği (sn) ve tekrar sayısı
+GOLD_FETCH_BUDGET = float(os.environ.get('GOLD_FETCH_BUDGET', '5'))
+GOLD_HEDGE_AFTER = float(os.environ.get('GOLD_HEDGE_AFTER', '1'))
+GOLD_FETCH_RETRIES = int(os.environ.get('GOLD_FETCH_RETRIES', '2'))
+
+# Altın fiyatları panelinin varsayılan yenilenme aralığı (saniye)
+GOLD_REFRESH_INTERVAL = int(os.environ.get('GOLD_REFRESH_INTERVAL', '30'))
+
+# Ayarlanırsa fiyatlar worker.py'nin yayımladığı bu dosyadan okunur, uygulama kendisi veri çekmez
+GOLD_SNAPSHOT_PATH = os.environ.get('GOLD_SNAPSHOT_PATH', '')
+
+# Fiyat geçmişinin tutulduğu SQLite dosyası; isteğe bağlıdır, ayarlanmazsa geçmiş kaydedilmez
+PRICE_HISTORY_PATH = os.environ.get('PRICE_HISTORY_PATH', '')
+
+# Hesaplanan fiyatları JSON olarak sunan API (GOLD_API_PORT boşsa kapalı)
+GOLD_API_HOST = os.environ.get('GOLD_API_HOST', '127.0.0.1')
+GOLD_API_PORT = os.environ.get('GOLD_API_PORT', '')
+
+# Prometheus metrikleri (METRICS_PORT boşsa sunulmaz, yine de toplanır)
+METRICS_HOST = os.environ.get('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = os.environ.get('METRICS_PORT', '')
+
+STAGE_SECONDS = histogram('gold_stage_seconds', "Time spent in each price pipeline stage", ['stage'])
+SOURCE_FETCHES = counter('gold_source_fetches_total', "Price source fetches by outcome (success, empty, failure)", ['source', 'outcome'])
+SNAPSHOT_AGE = gauge('gold_snapshot_age_seconds', "Age of the gold price snapshot currently served")
+PANEL_UPDATES = counter(
+    'gold_panel_updates_total',
+    "Gold panel refreshes: rendered, or skipped because the snapshot fingerprint or the card content was unchanged",
+    ['result']
+)
 
 def is_valid_url(url):
     """
@@ -18,66 +74,72 @@ def is_valid_url(url):
     except:
         return False
 
-def extract_numbers_from_text(text):
+def extract_numbers_from_text(text, number_locale=None):
     """
-    Extract numerical values from text using regex
+    Extract numerical values from text as a float64 array.
+    Thousands and decimal separators follow `number_locale` (en_US: 1,234.56,
+    tr_TR: 1.234,56); signs and percentages ("-3", "12%", "%12") are read too.
     """
-    # Pattern to match numbers (including decimals and negative numbers)
-    number_pattern = r'-?\d+\.?\d*'
-    numbers = re.findall(number_pattern, text)
-    
-    # Convert to float and filter out empty strings
-    numerical_values = []
-    for num in numbers:
-        try:
-            val = float(num)
-            numerical_values.append(val)
-        except ValueError:
-            continue
-    
-    return numerical_values
+    return parse_numbers(text, number_locale or NUMBER_LOCALE)
 
-def scrape_website_data(url, css_selector=None):
+def selected_text(soup, css_selector=None, warnings=None):
     """
-    Scrape data from a website and extract numerical values
+    Text of the elements matching the CSS selector, or of the whole page.
+    Problems with the selector are appended to `warnings` (shown by the caller;
+    batch scrapes run on worker threads, which cannot write to the page).
     """
+    warnings = [] if warnings is None else warnings
+    if not css_selector:
+        return soup.get_text()
     try:
-        # Add headers to mimic a real browser request
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        # Make the request
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
+        elements = soup.select(css_selector)
+        if not elements:
+            warnings.append(f"No elements found with CSS selector: {css_selector}")
+            return soup.get_text()
+        return ' '.join([elem.get_text() for elem in elements])
+    except Exception as e:
+        warnings.append(f"Invalid CSS selector. Using full page content. Error: {str(e)}")
+        return soup.get_text()
+
+def scrape_website_data(url, css_selector=None, streaming=False, max_bytes=None, max_numbers=None, bounded=False,
+                        number_locale=None):
+    """
+    Scrape data from a website and extract numerical values.
+    With streaming=True the page is read in chunks with size limits (see scrape_website_data_streaming);
+    with bounded=True it is read whole up to the limits and released right after extraction
+    (see scrape_website_data_bounded).
+    Successful results carry a 'warnings' list for the caller to show.
+    """
+    if streaming:
+        result = scrape_website_data_streaming(url, max_bytes, max_numbers, number_locale)
+        if result['success']:
+            result['warnings'] = (
+                ["CSS selectors are not supported in streaming mode. Using full page content."] if css_selector else []
+            )
+        return result
+    if bounded:
+        return scrape_website_data_bounded(url, css_selector, max_bytes, max_numbers, number_locale)
+    
+    warnings = []
+    try:
+        # Make the request through the shared pooled client (unchanged pages come back as 304)
+        response = get_http_client().fetch(url, timeout=10)
         
         # Parse HTML
         soup = BeautifulSoup(response.content, 'html.parser')
         
         # If CSS selector is provided, use it to find specific elements
-        if css_selector:
-            try:
-                elements = soup.select(css_selector)
-                if not elements:
-                    st.warning(f"No elements found with CSS selector: {css_selector}")
-                    text_content = soup.get_text()
-                else:
-                    text_content = ' '.join([elem.get_text() for elem in elements])
-            except Exception as e:
-                st.warning(f"Invalid CSS selector. Using full page content. Error: {str(e)}")
-                text_content = soup.get_text()
-        else:
-            # Get all text content from the page
-            text_content = soup.get_text()
+        text_content = selected_text(soup, css_selector, warnings)
         
         # Extract numerical values
-        numbers = extract_numbers_from_text(text_content)
+        numbers = extract_numbers_from_text(text_content, number_locale)
         
         return {
             'success': True,
             'numbers': numbers,
             'text_sample': text_content[:500] + "..." if len(text_content) > 500 else text_content,
-            'total_numbers_found': len(numbers)
+            'total_numbers_found': len(numbers),
+            'warnings': warnings
         }
         
     except requests.exceptions.RequestException as e:
@@ -91,450 +153,1166 @@ def scrape_website_data(url, css_selector=None):
             'error': f"An error occurred while processing the website: {str(e)}"
         }
 
-def scrape_kapalicarsi_gold_prices():
+# Number format used to read extracted text (en_US or tr_TR)
+NUMBER_LOCALE = os.environ.get('NUMBER_LOCALE', 'en_US')
+NUMBER_FORMAT_LABELS = {'en_US': "1,234.56 (en_US)", 'tr_TR': "1.234,56 (tr_TR)"}
+
+# Streaming mode limits (overridable per call)
+STREAM_CHUNK_SIZE = 64 * 1024
+STREAM_MAX_BYTES = int(os.environ.get('STREAM_MAX_BYTES', str(20 * 1024 * 1024)))
+STREAM_MAX_NUMBERS = int(os.environ.get('STREAM_MAX_NUMBERS', '100000'))
+
+# Trailing characters that may belong to a number continued in the next chunk (besides digits)
+NUMBER_TAIL_CHARS = frozenset('.,+-−%')
+# Longest trailing run held back for the next chunk; a longer run is passed on as it is
+NUMBER_TAIL_MAX = 1024
+
+def number_tail_start(text):
     """
-    Kapalıçarşı altın fiyatlarını çeker ve Has Altın kurlarını alır
+    Start of the trailing run of digits and number punctuation that may continue in
+    the next chunk (len(text) if none). Scans back at most NUMBER_TAIL_MAX characters,
+    so a long digit run costs linear time instead of a regex retry at every position.
     """
-    try:
-        url = "https://canlidoviz.com/altin-fiyatlari/kapali-carsi"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
+    end = len(text)
+    limit = max(0, end - NUMBER_TAIL_MAX)
+    start = end
+    while start > limit and (text[start - 1].isdecimal() or text[start - 1] in NUMBER_TAIL_CHARS):
+        start -= 1
+    if start == limit and limit and (text[limit - 1].isdecimal() or text[limit - 1] in NUMBER_TAIL_CHARS):
+        # Not a number anyone reads; holding it back would re-copy it with every chunk
+        return end
+    return start
+
+class StreamingTextParser(HTMLParser):
+    """
+    Incremental HTML parser that collects visible text the way soup.get_text() does
+    (script/style/template contents are skipped)
+    """
+    SKIPPED_TAGS = {'script', 'style', 'template'}
+    
+    def __init__(self, sample_size=500):
+        super().__init__(convert_charrefs=True)
+        self.sample_size = sample_size
+        self.text_sample = ''
+        self._skip_depth = 0
+        self._pending = []
+    
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED_TAGS:
+            self._skip_depth += 1
+    
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+    
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        if len(self.text_sample) <= self.sample_size:
+            self.text_sample += data[:self.sample_size + 1 - len(self.text_sample)]
+        self._pending.append(data)
+    
+    def take_text(self, final=False):
+        """
+        Return the text collected so far, holding back a trailing partial number unless final
+        """
+        text = ''.join(self._pending)
+        if final:
+            self._pending = []
+            return text
         
-        response = requests.get(url, headers=headers, timeout=10)
+        split_at = number_tail_start(text)
+        self._pending = [text[split_at:]] if split_at < len(text) else []
+        return text[:split_at]
+
+def iter_website_numbers(url, max_bytes=None, max_numbers=None, stats=None, number_locale=None):
+    """
+    Stream a page in chunks and yield its numbers as they are parsed.
+    Stops after `max_bytes` of body or `max_numbers` numbers; `stats`, if given,
+    is filled with bytes_read, truncated and text_sample.
+    """
+    max_bytes = STREAM_MAX_BYTES if max_bytes is None else max_bytes
+    max_numbers = STREAM_MAX_NUMBERS if max_numbers is None else max_numbers
+    stats = {} if stats is None else stats
+    stats.update({'bytes_read': 0, 'truncated': False, 'text_sample': ''})
+    
+    parser = StreamingTextParser()
+    yielded = 0
+    
+    host = urlparse(url).hostname or ''
+    with get_http_client().get(url, timeout=10, stream=True) as response:
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Sayfa içeriğinden altın fiyatlarını regex ile çek
-        page_text = soup.get_text()
-        
-        gold_data = {}
-        
-        # Has Altın için regex pattern
-        has_altin_pattern = r'Has Altın.*?(\d+\.\d+).*?(\d+\.\d+)'
-        has_match = re.search(has_altin_pattern, page_text, re.DOTALL)
+        # Content-Type charset if given, otherwise UTF-8 (requests would guess ISO-8859-1)
+        encoding = requests.utils.get_encoding_from_headers(response.headers)
+        if 'charset' not in response.headers.get('Content-Type', '').lower():
+            encoding = 'utf-8'
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
         
-        if has_match:
-            try:
-                alis = float(has_match.group(1))
-                satis = float(has_match.group(2))
-                gold_data['Has Altın'] = {
-                    'Alış': alis,
-                    'Satış': satis
-                }
-            except ValueError:
-                pass
-        
-        # Cumhuriyet/Ata Altın için regex pattern (çeşitli yazım şekilleri)
-        cumhuriyet_patterns = [
-            r'Cumhuriyet.*?(\d+\.\d+).*?(\d+\.\d+)',
-            r'cumhuriyet.*?(\d+\.\d+).*?(\d+\.\d+)',
-            r'Ata.*?(\d+\.\d+).*?(\d+\.\d+)',
-            r'ata.*?(\d+\.\d+).*?(\d+\.\d+)',
-            r'ATA.*?(\d+\.\d+).*?(\d+\.\d+)'
-        ]
-        
-        for pattern in cumhuriyet_patterns:
-            cumhuriyet_match = re.search(pattern, page_text, re.DOTALL | re.IGNORECASE)
-            if cumhuriyet_match:
-                try:
-                    alis = float(cumhuriyet_match.group(1))
-                    satis = float(cumhuriyet_match.group(2))
-                    gold_data['Cumhuriyet Altın'] = {
-                        'Alış': alis,
-                        'Satış': satis
-                    }
-                    break
-                except ValueError:
-                    continue
-        
-        # Gram Altın için regex pattern
-        gram_patterns = [
-            r'Gram.*?Altın.*?(\d+\.\d+).*?(\d+\.\d+)',
-            r'gram.*?altın.*?(\d+\.\d+).*?(\d+\.\d+)',
-            r'GRAM.*?ALTIN.*?(\d+\.\d+).*?(\d+\.\d+)'
-        ]
-        
-        for pattern in gram_patterns:
-            gram_match = re.search(pattern, page_text, re.DOTALL | re.IGNORECASE)
-            if gram_match:
-                try:
-                    alis = float(gram_match.group(1))
-                    satis = float(gram_match.group(2))
-                    gold_data['Gram Altın'] = {
-                        'Alış': alis,
-                        'Satış': satis
-                    }
+        for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+            if stats['bytes_read'] + len(chunk) > max_bytes:
+                chunk = chunk[:max_bytes - stats['bytes_read']]
+                stats['truncated'] = True
+            stats['bytes_read'] += len(chunk)
+            HTTP_FETCH_BYTES.inc(len(chunk), host=host)
+            
+            parser.feed(decoder.decode(chunk))
+            final = stats['truncated']
+            if final:
+                parser.feed(decoder.decode(b'', final=True))
+                parser.close()
+            
+            for number in extract_numbers_from_text(parser.take_text(final=final), number_locale).tolist():
+                if yielded >= max_numbers:
+                    stats['truncated'] = True
                     break
-                except ValueError:
-                    continue
-        
-        # Çeyrek Altın için regex pattern  
-        ceyrek_pattern = r'Çeyrek Altın(?!.*Eski).*?(\d+\.\d+).*?(\d+\.\d+)'
-        ceyrek_match = re.search(ceyrek_pattern, page_text, re.DOTALL)
+                yielded += 1
+                yield number
+            
+            stats['text_sample'] = parser.text_sample
+            if stats['truncated']:
+                return
         
-        if ceyrek_match:
-            try:
-                alis = float(ceyrek_match.group(1))
-                satis = float(ceyrek_match.group(2))
-                gold_data['Çeyrek Altın'] = {
-                    'Alış': alis,
-                    'Satış': satis
-                }
-            except ValueError:
-                pass
+        parser.feed(decoder.decode(b'', final=True))
+        parser.close()
+        for number in extract_numbers_from_text(parser.take_text(final=True), number_locale).tolist():
+            if yielded >= max_numbers:
+                stats['truncated'] = True
+                break
+            yielded += 1
+            yield number
+        stats['text_sample'] = parser.text_sample
+
+def scrape_website_data_streaming(url, max_bytes=None, max_numbers=None, number_locale=None):
+    """
+    Size-bounded variant of scrape_website_data: the body is read in chunks and
+    parsed incrementally, so no full page, tree or text is ever held in memory
+    """
+    stats = {}
+    try:
+        numbers = list(iter_website_numbers(url, max_bytes, max_numbers, stats, number_locale))
+        text_sample = stats['text_sample']
         
-        # Alternatif olarak tablo verilerini de dene
-        table_rows = soup.find_all('tr')
+        return {
+            'success': True,
+            'numbers': numbers,
+            'text_sample': text_sample[:500] + "..." if len(text_sample) > 500 else text_sample,
+            'total_numbers_found': len(numbers),
+            'bytes_read': stats['bytes_read'],
+            'truncated': stats['truncated']
+        }
         
-        for row in table_rows:
-            cells = row.find_all('td')
-            if len(cells) >= 3:
-                name_cell = cells[0].get_text(strip=True)
-                
-                if 'Has Altın' in name_cell or 'XHGLD' in name_cell:
-                    try:
-                        alis_text = cells[1].get_text(strip=True).replace(',', '.')
-                        satis_text = cells[2].get_text(strip=True).split()[0].replace(',', '.')
-                        alis_fiyat = float(alis_text)
-                        satis_fiyat = float(satis_text)
-                        gold_data['Has Altın'] = {
-                            'Alış': alis_fiyat,
-                            'Satış': satis_fiyat
-                        }
-                    except (ValueError, IndexError):
-                        continue
-                
-                elif 'Çeyrek Altın' in name_cell and 'Eski' not in name_cell:
-                    try:
-                        alis_text = cells[1].get_text(strip=True).replace(',', '.')
-                        satis_text = cells[2].get_text(strip=True).split()[0].replace(',', '.')
-                        alis_fiyat = float(alis_text)
-                        satis_fiyat = float(satis_text)
-                        gold_data['Çeyrek Altın'] = {
-                            'Alış': alis_fiyat,
-                            'Satış': satis_fiyat
-                        }
-                    except (ValueError, IndexError):
-                        continue
-                        
-                elif any(keyword in name_cell.upper() for keyword in ['CUMHURIYET', 'ATA']):
-                    try:
-                        alis_text = cells[1].get_text(strip=True).replace(',', '.')
-                        satis_text = cells[2].get_text(strip=True).split()[0].replace(',', '.')
-                        alis_fiyat = float(alis_text)
-                        satis_fiyat = float(satis_text)
-                        gold_data['Cumhuriyet Altın'] = {
-                            'Alış': alis_fiyat,
-                            'Satış': satis_fiyat
-                        }
-                    except (ValueError, IndexError):
-                        continue
-                        
-                elif any(keyword in name_cell.upper() for keyword in ['GRAM', 'GA']):
-                    try:
-                        # Özel format kontrolü: "GAGram Altın05/07/25" gibi
-                        if 'GA' in name_cell and 'Gram' in name_cell:
-                            alis_text = cells[1].get_text(strip=True).replace(',', '.')
-                            # Satış fiyatı bazen "4286.520.00%0.00" formatında olabilir
-                            satis_raw = cells[2].get_text(strip=True)
-                            # İlk sayıyı al (% işaretinden önceki kısım)
-                            satis_text = re.split(r'[%\s]', satis_raw)[0].replace(',', '.')
-                            
-                            alis_fiyat = float(alis_text)
-                            satis_fiyat = float(satis_text)
-                            gold_data['Gram Altın'] = {
-                                'Alış': alis_fiyat,
-                                'Satış': satis_fiyat
-                            }
-                        else:
-                            # Normal format
-                            alis_text = cells[1].get_text(strip=True).replace(',', '.')
-                            satis_text = cells[2].get_text(strip=True).split()[0].replace(',', '.')
-                            alis_fiyat = float(alis_text)
-                            satis_fiyat = float(satis_text)
-                            gold_data['Gram Altın'] = {
-                                'Alış': alis_fiyat,
-                                'Satış': satis_fiyat
-                            }
-                    except (ValueError, IndexError):
-                        continue
+    except requests.exceptions.RequestException as e:
+        return {
+            'success': False,
+            'error': f"Failed to fetch the website: {str(e)}"
+        }
+    except Exception as e:
+        return {
+            'success': False,
+            'error': f"An error occurred while processing the website: {str(e)}"
+        }
+
+def read_capped_body(url, max_bytes=None, timeout=10):
+    """
+    Body of `url`, read in chunks and cut at `max_bytes`.
+    Returns (body, charset from Content-Type or None, truncated).
+    """
+    max_bytes = STREAM_MAX_BYTES if max_bytes is None else max_bytes
+    
+    with get_http_client().get(url, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        charset = None
+        if 'charset' in response.headers.get('Content-Type', '').lower():
+            charset = requests.utils.get_encoding_from_headers(response.headers)
+        body, truncated = read_capped(response, max_bytes, STREAM_CHUNK_SIZE)
+    
+    if truncated and (charset or 'utf-8').lower().replace('_', '-') in ('utf-8', 'utf8'):
+        body = trim_partial_utf8(body)
+    return body, charset, truncated
+
+def trim_partial_utf8(body):
+    """
+    Drop a UTF-8 sequence cut off at the end of `body`, so a truncated page
+    still decodes as UTF-8 instead of falling back to a guessed charset
+    """
+    for i in range(1, min(4, len(body)) + 1):
+        byte = body[-i]
+        if byte < 0x80:
+            return body
+        if byte >= 0xC0:
+            length = 2 if byte < 0xE0 else 3 if byte < 0xF0 else 4
+            return body if length == i else body[:-i]
+    return body
+
+def extract_page_numbers(content, css_selector=None, max_numbers=None, from_encoding=None, number_locale=None,
+                         warnings=None):
+    """
+    Numbers of a page (or of the elements matching the selector) as a float64 array.
+    The tree is torn down as soon as the text is taken, and the text once the
+    numbers and sample are out. Returns (numbers, text sample, truncated);
+    selector problems are appended to `warnings`.
+    """
+    max_numbers = STREAM_MAX_NUMBERS if max_numbers is None else max_numbers
+    if isinstance(content, str):
+        from_encoding = None
+    
+    soup = BeautifulSoup(content, 'html.parser', from_encoding=from_encoding)
+    try:
+        text_content = selected_text(soup, css_selector, warnings)
+    finally:
+        release_soup(soup)
+        del soup
+    
+    numbers = extract_numbers_from_text(text_content, number_locale)
+    truncated = numbers.size > max_numbers
+    # Copy the kept slice so the full array can be freed
+    values = numbers[:max_numbers].copy() if truncated else numbers
+    del numbers
+    
+    text_sample = text_content[:500] + "..." if len(text_content) > 500 else text_content
+    del text_content
+    return values, text_sample, truncated
+
+def scrape_website_data_bounded(url, css_selector=None, max_bytes=None, max_numbers=None, number_locale=None):
+    """
+    Memory-bounded variant of scrape_website_data: the body is capped at
+    `max_bytes`, the page and its tree are released right after extraction and
+    only the numbers (as a float64 array) and a text sample are kept.
+    Unlike streaming mode, CSS selectors work.
+    """
+    warnings = []
+    try:
+        content, charset, body_truncated = read_capped_body(url, max_bytes)
+        bytes_read = len(content)
+        numbers, text_sample, numbers_truncated = extract_page_numbers(content, css_selector, max_numbers, charset,
+                                                                       number_locale, warnings)
+        del content
         
         return {
             'success': True,
-            'data': gold_data
+            'numbers': numbers,
+            'text_sample': text_sample,
+            'total_numbers_found': int(numbers.size),
+            'bytes_read': bytes_read,
+            'truncated': body_truncated or numbers_truncated,
+            'warnings': warnings
         }
         
+    except requests.exceptions.RequestException as e:
+        return {
+            'success': False,
+            'error': f"Failed to fetch the website: {str(e)}"
+        }
     except Exception as e:
         return {
             'success': False,
-            'error': f"Kapalıçarşı verilerini çekerken hata oluştu: {str(e)}"
+            'error': f"An error occurred while processing the website: {str(e)}"
         }
 
-def calculate_ceyrek_with_has_gold(has_gold_rate, alis_multiplier=1.59, satis_multiplier=1.60):
+# Batch extraction concurrency limits
+BATCH_MAX_WORKERS = int(os.environ.get('BATCH_MAX_WORKERS', '16'))
+BATCH_PER_HOST_LIMIT = int(os.environ.get('BATCH_PER_HOST_LIMIT', '4'))
+
+def parse_url_list(text):
     """
-    Has Altın kuruyla çeyrek altın hesaplaması yapar
-    Alış için 1.59, satış için 1.60 çarpan kullanır
+    Split pasted text or an uploaded file into unique URLs (one per line, or whitespace separated).
+    Commas are not separators: they are valid inside URLs (?ids=1,2).
     """
-    if not has_gold_rate:
-        return None
+    urls = []
+    seen = set()
+    for token in text.split():
+        token = token.strip().strip('"\'')
+        if token and token not in seen:
+            seen.add(token)
+            urls.append(token)
+    return urls
+
+def scrape_websites(urls, css_selector=None, max_workers=None, per_host_limit=None, **scrape_options):
+    """
+    Scrape many URLs concurrently and yield (url, result) pairs as they finish.
+    At most `max_workers` requests run at once and at most `per_host_limit` per host;
+    URLs waiting on a busy host do not hold a worker.
+    """
+    max_workers = max_workers or BATCH_MAX_WORKERS
+    per_host_limit = per_host_limit or BATCH_PER_HOST_LIMIT
     
-    calculated_alis = has_gold_rate['Alış'] * alis_multiplier
-    calculated_satis = has_gold_rate['Satış'] * satis_multiplier
+    # Bekleyen URL'ler host bazında sıraya alınır
+    queues = {}
+    for url in urls:
+        queues.setdefault(urlparse(url).netloc, []).append(url)
+    for host_queue in queues.values():
+        host_queue.reverse()
     
-    return {
-        'Has Altın Alış': has_gold_rate['Alış'],
-        'Has Altın Satış': has_gold_rate['Satış'],
-        'Alış Çarpanı': alis_multiplier,
-        'Satış Çarpanı': satis_multiplier,
-        'Hesaplanan Çeyrek Alış': calculated_alis,
-        'Hesaplanan Çeyrek Satış': calculated_satis
-    }
+    host_in_flight = {host: 0 for host in queues}
+    running = {}
+    
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='batch-scrape') as executor:
+        def fill():
+            for host, host_queue in queues.items():
+                while host_queue and host_in_flight[host] < per_host_limit and len(running) < max_workers:
+                    url = host_queue.pop()
+                    future = executor.submit(scrape_website_data, url, css_selector, **scrape_options)
+                    running[future] = (host, url)
+                    host_in_flight[host] += 1
+        
+        fill()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                host, url = running.pop(future)
+                host_in_flight[host] -= 1
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {'success': False, 'error': f"An error occurred while processing the website: {str(e)}"}
+                yield url, result
+            fill()
 
-def create_four_column_gold_table(ceyrek_calculation, yarim_calculation):
+def batch_result_frame(url, result, multiplier, operation='multiply'):
     """
-    4 kolon altın tablosu: Çeyrek Alış, Çeyrek Satış, Yarım Alış, Yarım Satış
+    Results DataFrame of one URL tagged by source URL, and its statistics.
+    (None, None) when the URL failed or had no numbers.
     """
-    html = f"""
-    <style>
-    .gold-container {{
-        width: 100%;
-        max-width: 1200px;
-        margin: 0 auto;
-        padding: 20px;
-        font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-    }}
-    
-    .gold-grid {{
-        display: grid;
-        grid-template-columns: 1fr 1fr 1fr 1fr;
-        gap: 15px;
-        margin-bottom: 30px;
-    }}
-    
-    @media (max-width: 768px) {{
-        .gold-grid {{
-            grid-template-columns: 1fr 1fr;
-            gap: 10px;
-        }}
-    }}
-    
-    @media (max-width: 480px) {{
-        .gold-grid {{
-            grid-template-columns: 1fr;
-            gap: 10px;
-        }}
-        .gold-container {{
-            padding: 10px;
-        }}
-    }}
-    
-    .gold-card {{
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        border-radius: 15px;
-        padding: 20px;
-        color: white;
-        box-shadow: 0 8px 25px rgba(0,0,0,0.15);
-        transition: transform 0.3s ease;
-        text-align: center;
-    }}
-    
-    .gold-card:hover {{
-        transform: translateY(-3px);
-    }}
-    
-    .card-title {{
-        font-size: 18px;
-        font-weight: bold;
-        margin-bottom: 15px;
-        text-shadow: 1px 1px 2px rgba(0,0,0,0.3);
-    }}
-    
-    .price-value {{
-        font-size: 24px;
-        font-weight: bold;
-        color: #FFD700;
-        text-shadow: 1px 1px 2px rgba(0,0,0,0.5);
-        margin-top: 10px;
-    }}
-    
-    @media (max-width: 768px) {{
-        .card-title {{
-            font-size: 16px;
-        }}
-        .price-value {{
-            font-size: 20px;
-        }}
-        .gold-card {{
-            padding: 15px;
-        }}
-    }}
-    
-    @media (max-width: 480px) {{
-        .card-title {{
-            font-size: 14px;
-        }}
-        .price-value {{
-            font-size: 18px;
-        }}
-        .gold-card {{
-            padding: 12px;
-        }}
-    }}
-    </style>
+    if not (result['success'] and result['total_numbers_found']):
+        return None, None
+    df, stats = calculate_results_frame(result['numbers'], multiplier, operation)
+    df.insert(0, 'Source URL', url)
+    return df, stats
+
+def batch_results_frame(frames):
+    """
+    Combine the per-URL result frames into one DataFrame
+    """
+    if not frames:
+        return pd.DataFrame(columns=['Source URL', 'Index', 'Original Value', 'Multiplier/Operand', 'Operation', 'Result'])
+    return pd.concat(frames, ignore_index=True)
+
+# Fiyat kaynakları (URL, satır seçicileri, ürün eşlemesi); uygulama açılışında bir kez derlenir
+GOLD_SOURCES_PATH = os.environ.get(
+    'GOLD_SOURCES_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'price_sources.json')
+)
+
+# Bir kaynak sayfasından okunacak en fazla bayt; daha büyük yanıtlar bu boyutta kesilir
+GOLD_SOURCE_MAX_BYTES = int(os.environ.get('GOLD_SOURCE_MAX_BYTES', str(5 * 1024 * 1024)))
+
+# Has Altın kurunun kaynaklardan nasıl birleştirileceği: 'median' ya da 'first' (ilk geçerli yanıt)
+GOLD_CONSENSUS = os.environ.get('GOLD_CONSENSUS', 'median')
+
+# Aynı anda yenilenen oturumlar bir kaynağı tek istekle çeker
+SOURCE_FLIGHTS = get_flight('source')
+
+def source_adapters():
+    """
+    Yapılandırılmış tüm fiyat kaynakları (süreç başına bir kez derlenir)
+    """
+    return get_adapters(GOLD_SOURCES_PATH, fallbacks={'page_text': _parse_kapalicarsi_page_text})
+
+def source_options():
+    """
+    Kaynak çağrıları için ortak dayanıklılık ayarları
+    """
+    return {'budget': GOLD_FETCH_BUDGET, 'hedge_after': GOLD_HEDGE_AFTER, 'retries': GOLD_FETCH_RETRIES}
+
+def fetch_source(adapter, timeout=10):
+    """
+    Kaynak sayfasını tek seferde çekip ayrıştırır; hata olursa istisna fırlatır.
+    Yanıt GOLD_SOURCE_MAX_BYTES ile sınırlıdır.
+    """
+    try:
+        data = adapter.fetch(get_http_client(), timeout=timeout, max_bytes=GOLD_SOURCE_MAX_BYTES)
+    except Exception:
+        SOURCE_FETCHES.inc(source=adapter.name, outcome='failure')
+        raise
+    SOURCE_FETCHES.inc(source=adapter.name, outcome='success' if adapter.is_good(data) else 'empty')
+    return data
+
+def scrape_source(adapter):
+    """
+    Kaynağı dayanıklı şekilde çeker (SourceResult döner).
+    Tekrar deneme, paralel ikinci istek ve devre kesici gecikme bütçesi içinde uygulanır;
+    kaynak yanıt vermezse son geçerli veri 'stale' olarak işaretlenip döndürülür.
+    Aynı URL için süren bir çağrı varsa yenisi başlatılmaz, onun sonucu paylaşılır.
+    """
+    source = get_source(
+        adapter.name,
+        functools.partial(fetch_source, adapter),
+        is_good=adapter.is_good,
+        **source_options()
+    )
+    return SOURCE_FLIGHTS.do(adapter.url, source.call)
+
+def parse_kapalicarsi_gold_prices(html):
+    """
+    Kapalıçarşı sayfasının HTML içeriğinden altın fiyatlarını yapılandırmadaki 'kapalicarsi' kaynağıyla ayrıştırır.
+    Tablo satırları tek geçişte dolaşılır; tabloda bulunamayan ürünler için sayfa metnine bakılır.
+    """
+    adapter = next(adapter for adapter in source_adapters() if adapter.name == 'kapalicarsi')
+    return adapter.parse(html)
+
+@STAGE_SECONDS.time(stage='page_text_scan')
+def _parse_kapalicarsi_page_text(html):
+    """
+    Tablo bulunamadığında sayfa metninden altın fiyatlarını çeker
+    """
+    soup = BeautifulSoup(html, 'html.parser')
     
-    <div class="gold-container">
-        <div class="gold-grid">
-            <div class="gold-card">
-                <div class="card-title">🔸 Çeyrek Alış</div>
-                <div class="price-value">{ceyrek_calculation['Hesaplanan Çeyrek Alış']:.2f} TL</div>
-            </div>
-            
-            <div class="gold-card">
-                <div class="card-title">🔸 Çeyrek Satış</div>
-                <div class="price-value">{ceyrek_calculation['Hesaplanan Çeyrek Satış']:.2f} TL</div>
-            </div>
-            
-            <div class="gold-card">
-                <div class="card-title">🔹 Yarım Alış</div>
-                <div class="price-value">{yarim_calculation['Hesaplanan Yarım Alış']:.2f} TL</div>
-            </div>
-            
-            <div class="gold-card">
-                <div class="card-title">🔹 Yarım Satış</div>
-                <div class="price-value">{yarim_calculation['Hesaplanan Yarım Satış']:.2f} TL</div>
-            </div>
-        </div>
-    </div>
+    # Ayraçla birleştir ki tarih ve fiyat gibi komşu metinler tek sayıya yapışmasın
+    page_text = soup.get_text(' ')
+    # Ağacı hemen serbest bırak; yalnızca metin gerekiyor
+    release_soup(soup)
+    del soup
+    
+    return extract_prices_from_page_text(page_text)
+
+# Sayfa metninde ürün etiketleri. Tek geçişte taranır; "Ata" yalnızca tam kelime olarak eşleşir
+# (ör. "data", "Hatay" eşleşmez).
+PAGE_TEXT_LABEL_PATTERN = re.compile(
+    r'(?P<has>Has Altın)'
+    r'|(?P<ceyrek>Çeyrek Altın)'
+    r'|(?P<gram>(?i:gram)\s{0,3}(?i:altın))'
+    r'|(?P<cumhuriyet>(?i:cumhuriyet))'
+    r'|(?P<ata>\b(?:Ata|ATA)\b)'
+)
+
+PAGE_TEXT_DECIMAL_PATTERN = re.compile(r'\d+\.\d+')
+
+# Etiketten sonra alış/satış fiyatlarının aranacağı en fazla karakter sayısı
+PAGE_TEXT_PRICE_WINDOW = 200
+
+# Sayfa metni taraması için sayfa başına CPU süresi bütçesi (saniye, yalnızca bu iş parçacığı).
+# Yalnızca etiket taramasını kapsar; öncesindeki HTML ayrıştırma ve get_text() dahil değildir.
+PAGE_TEXT_CPU_BUDGET = float(os.environ.get('PAGE_TEXT_CPU_BUDGET', '0.5'))
+
+PAGE_TEXT_SCAN_TRUNCATED = counter(
+    'page_text_scan_truncated_total',
+    "Page-text price scans stopped by the CPU budget before the end of the text"
+)
+
+# Aynı ürün için birden fazla etiket varsa öncelik (küçük olan kazanır)
+PAGE_TEXT_LABEL_PRODUCTS = {
+    'has': ('Has Altın', 0),
+    'ceyrek': ('Çeyrek Altın', 0),
+    'gram': ('Gram Altın', 0),
+    'cumhuriyet': ('Cumhuriyet Altın', 0),
+    'ata': ('Cumhuriyet Altın', 1)
+}
+
+def extract_prices_from_page_text(page_text, cpu_budget=None):
+    """
+    Sayfa metninden altın fiyatlarını doğrusal sürede çeker.
+    Ondalık sayılar metinde bir kez bulunur; her etiketten sonraki sınırlı penceredeki ilk iki sayı
+    (alış, satış) ikili aramayla alınır. Tarama bu iş parçacığının CPU bütçesini aşarsa o ana kadar
+    bulunanlar döndürülür ve page_text_scan_truncated_total artırılır.
     """
+    if cpu_budget is None:
+        cpu_budget = PAGE_TEXT_CPU_BUDGET
+    # thread_time: diğer iş parçacıklarının (paralel kaynaklar, oturumlar) CPU'su bütçeden düşmez
+    deadline = time.thread_time() + cpu_budget
+    
+    numbers = list(PAGE_TEXT_DECIMAL_PATTERN.finditer(page_text))
+    number_starts = [number.start() for number in numbers]
+    found = {}
     
-    return html
+    for label in PAGE_TEXT_LABEL_PATTERN.finditer(page_text):
+        if time.thread_time() > deadline:
+            PAGE_TEXT_SCAN_TRUNCATED.inc()
+            break
+        
+        product, priority = PAGE_TEXT_LABEL_PRODUCTS[label.lastgroup]
+        if product in found and found[product][0] <= priority:
+            continue
+        
+        # Etiketten sonra başlayan ilk iki sayı pencere içinde başlamalı
+        window_end = label.end() + PAGE_TEXT_PRICE_WINDOW
+        index = bisect.bisect_left(number_starts, label.end())
+        prices = numbers[index:index + 2]
+        if len(prices) < 2 or prices[1].start() >= window_end:
+            continue
+        
+        # Eski tip Çeyrek'i atla ("Çeyrek Altın (Eski) ...")
+        if label.lastgroup == 'ceyrek' and 'Eski' in page_text[label.end():prices[0].start()]:
+            continue
+        
+        found[product] = (priority, {
+            'Alış': float(prices[0].group(0)),
+            'Satış': float(prices[1].group(0))
+        })
+        
+        # Tüm ürünler en yüksek öncelikle bulunduysa taramayı bitir
+        if len(found) == 4 and all(entry[0] == 0 for entry in found.values()):
+            break
+    
+    return {product: entry[1] for product, entry in found.items()}
+
+# Altın kartları için ortak stil; tam sayfa çalışmasında bir kez gönderilir
+GOLD_PANEL_STYLESHEET = """
+<style>
+.gold-panel h3 {
+    text-align: center;
+    color: white;
+}
+.gold-cards {
+    display: grid;
+    grid-template-columns: 1fr 1fr;
+    gap: 1rem;
+    margin-bottom: 1rem;
+}
+@media (max-width: 480px) {
+    .gold-cards {
+        grid-template-columns: 1fr;
+    }
+}
+.gold-card {
+    background: #ff8c42;
+    border-radius: 8px;
+    padding: 15px;
+    text-align: center;
+    margin: 2px;
+    box-shadow: 0 2px 8px rgba(0,0,0,0.1);
+}
+.gold-card h5 {
+    margin: 0 0 10px 0;
+    color: black;
+    font-size: 16px;
+    font-weight: bold;
+}
+.gold-price {
+    font-size: 20px;
+    font-weight: 900;
+    color: black;
+}
+</style>
+"""
+
+GOLD_ROW_TEMPLATE = (
+    '<h3>{title}</h3>'
+    '<div class="gold-cards">'
+    '<div class="gold-card"><h5>Alış</h5><div class="gold-price">{alis}</div></div>'
+    '<div class="gold-card"><h5>Satış</h5><div class="gold-price">{satis}</div></div>'
+    '</div>'
+)
+
+# Panelde gösterilen ürünler ve sırası
+GOLD_PANEL_PRODUCTS = ['Çeyrek Altın', 'Yarım Altın', 'Tam Altın', 'Cumhuriyet Altın', '24 Ayar Altın']
+
+def format_gold_price(value):
+    """
+    Kartta gösterilecek fiyat; bilinmeyen fiyat 0 yerine '—' olarak gösterilir
+    """
+    return f"{value:.2f} TL" if value is not None else "—"
+
+@functools.lru_cache(maxsize=32)
+def render_gold_card_grid(rows):
+    """
+    Tüm ürün satırlarını (başlık, alış, satış) tek bir HTML içeriğinde üretir.
+    Aynı değerler için önbellekteki içerik döndürülür.
+    """
+    body = ''.join(
+        GOLD_ROW_TEMPLATE.format(title=title, alis=format_gold_price(alis), satis=format_gold_price(satis))
+        for title, alis, satis in rows
+    )
+    return f'<div class="gold-panel">{body}</div>'
 
-def calculate_yarim_with_ceyrek(ceyrek_calculation):
+def gold_panel_rows(prices):
     """
-    Çeyrek altın fiyatlarını 2 ile çarparak yarım altın hesaplar
+    derive_gold_prices() sonucunu panelde gösterilecek (başlık, alış, satış) satırlarına çevirir
     """
-    yarim_alis = ceyrek_calculation['Hesaplanan Çeyrek Alış'] * 2
-    yarim_satis = ceyrek_calculation['Hesaplanan Çeyrek Satış'] * 2
+    return tuple(
+        (product, prices[product]['Alış'], prices[product]['Satış'])
+        for product in GOLD_PANEL_PRODUCTS
+        if product in prices
+    )
+
+def has_fresh_rate(result):
+    """
+    Kaynak sonucu taze ve geçerli bir Has Altın kuru içeriyor mu
+    """
+    if not result.value or result.stale or 'Has Altın' not in result.value:
+        return False
+    return valid_rate(result.value['Has Altın'])
+
+def combine_sources(adapters, results, arrival_order):
+    """
+    Kaynak sonuçlarını tek piyasa verisinde birleştirir.
+    Has Altın kuru kaynakların uzlaşısıdır (GOLD_CONSENSUS); taze veri varsa eski (stale) veriler kullanılmaz.
+    Diğer ürünler yapılandırmadaki sıraya göre ilk kaynaktan alınır.
+    """
+    market = {}
+    for adapter in adapters:
+        result = results.get(adapter.name)
+        if result is not None and result.value:
+            for product, rate in result.value.items():
+                market.setdefault(product, rate)
+    
+    has_rates = [
+        (name, results[name].value['Has Altın'], results[name].stale)
+        for name in arrival_order
+        if results[name].value and 'Has Altın' in results[name].value and valid_rate(results[name].value['Has Altın'])
+    ]
+    fresh = [(name, rate) for name, rate, stale in has_rates if not stale]
+    has_rate, used = consensus_rate(fresh or [(name, rate) for name, rate, _ in has_rates], GOLD_CONSENSUS)
     
+    if has_rate is None:
+        market.pop('Has Altın', None)
+        errors = '; '.join(
+            f"{adapter.label}: {results[adapter.name].error}"
+            for adapter in adapters
+            if adapter.name in results and results[adapter.name].error
+        )
+        return {'success': False, 'error': f"Has Altın kuru alınamadı ({errors or 'geçerli veri yok'})"}, used
+    
+    market['Has Altın'] = has_rate
     return {
-        'Hesaplanan Yarım Alış': yarim_alis,
-        'Hesaplanan Yarım Satış': yarim_satis
-    }
+        'success': True,
+        'data': market,
+        'stale': not fresh,
+        'fetched_at': min(results[name].fetched_at for name in used)
+    }, used
 
-def calculate_tam_with_yarim(yarim_calculation):
+def snapshot_fingerprint(kapali, canli_gram_satis):
     """
-    Yarım altın fiyatlarını 2 ile çarparak tam altın hesaplar
+    Panelde gösterilen her şeyi (fiyatlar ya da hata) kapsayan özet; değişmediyse türetme ve çizim atlanır
     """
-    tam_alis = yarim_calculation['Hesaplanan Yarım Alış'] * 2
-    tam_satis = yarim_calculation['Hesaplanan Yarım Satış'] * 2
+    content = [kapali.get('data') or kapali.get('error'), canli_gram_satis]
+    encoded = json.dumps(content, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+@STAGE_SECONDS.time(stage='snapshot')
+def fetch_gold_snapshot():
+    """
+    Yapılandırılmış tüm kaynakları paralel çekip tek bir fiyat anlık görüntüsü oluşturur.
+    Her kaynak gecikme bütçesiyle sınırlıdır; yavaş ya da bozuk bir kaynak diğerlerini bekletmez.
+    'stale' son geçerli değeri kullanılan kaynakları ve bu değerin alındığı zamanı içerir.
+    'first' uzlaşısında ilk taze ve geçerli Has Altın kuru gelince diğer kaynaklar beklenmez;
+    bu durumda diğer ürünler o ana kadar yanıt veren kaynaklardan alınır.
+    """
+    adapters = source_adapters()
+    results = {}
+    arrival_order = []
+    
+    # Kaynak yapılandırılmamışsa havuz açılmaz; combine_sources hata sonucu döner
+    if adapters:
+        executor = ThreadPoolExecutor(max_workers=len(adapters), thread_name_prefix='gold-fetch')
+        futures = {executor.submit(scrape_source, adapter): adapter for adapter in adapters}
+        try:
+            # Her çağrı bütçesi içinde döner; ek bir saniye iş parçacığı gecikmeleri için
+            for future in as_completed(futures, timeout=GOLD_FETCH_BUDGET + 1):
+                name = futures[future].name
+                results[name] = future.result()
+                arrival_order.append(name)
+                if GOLD_CONSENSUS == 'first' and has_fresh_rate(results[name]):
+                    break
+        except TimeoutError:
+            pass
+        finally:
+            # Beklenmeyen çağrılar arka planda tamamlanır; sonuçları sonraki yenilemede son geçerli veri olur
+            executor.shutdown(wait=False)
+    
+    kapali, used = combine_sources(adapters, results, arrival_order)
+    gram = kapali.get('data', {}).get('Canlı Gram Altın', {})
     
     return {
-        'Hesaplanan Tam Alış': tam_alis,
-        'Hesaplanan Tam Satış': tam_satis
+        'kapali': kapali,
+        'canli_gram_satis': gram.get('Satış'),
+        'fingerprint': snapshot_fingerprint(kapali, gram.get('Satış')),
+        'consensus': {'method': GOLD_CONSENSUS, 'sources': used},
+        'stale': {name: result.fetched_at for name, result in results.items() if result.stale},
+        'fetched_at': time.time()
     }
 
-def calculate_cumhuriyet_with_market_data(cumhuriyet_gold_data):
+@STAGE_SECONDS.time(stage='derive')
+def derive_gold_prices(gold_data, canli_gram_satis=None):
     """
-    Cumhuriyet altın fiyatlarından hem alış hem satış için 180 TL azaltma
+    Kapalıçarşı verilerinden tüm ürünlerin alış/satış fiyatlarını hesaplar (ürün -> {'Alış', 'Satış'}).
+    Hesaplama kuralları pricing_rules.json dosyasındadır; yalnızca girdisi değişen ürünler yeniden hesaplanır.
     """
-    cumhuriyet_alis = cumhuriyet_gold_data['Alış'] - 180
-    cumhuriyet_satis = cumhuriyet_gold_data['Satış'] - 180
+    if 'Has Altın' not in gold_data:
+        return {}
     
-    return {
-        'Hesaplanan Cumhuriyet Alış': cumhuriyet_alis,
-        'Hesaplanan Cumhuriyet Satış': cumhuriyet_satis
+    inputs = {
+        f'{product}/{side}': value
+        for product, sides in gold_data.items()
+        for side, value in sides.items()
     }
+    # Gram fiyatı alınamadıysa 24 Ayar satışı bilinmiyor (None)
+    inputs['Canlı Gram Altın/Satış'] = canli_gram_satis or None
+    
+    engine = get_pricing_engine()
+    return engine.to_products(engine.update(engine.input_vector(inputs)))
+
+def record_gold_snapshot(snapshot, history):
+    """
+    Başarılı bir anlık görüntünün türetilmiş fiyatlarını fiyat geçmişine yazar
+    """
+    # Son geçerli (stale) değerler geçmişe tekrar yazılmaz
+    if history is not None and snapshot['kapali']['success'] and not snapshot['kapali'].get('stale'):
+        prices = derive_gold_prices(snapshot['kapali']['data'], snapshot['canli_gram_satis'])
+        if prices:
+            history.record(prices, snapshot['fetched_at'])
+    return snapshot
+
+@st.cache_resource
+def get_price_history():
+    """
+    Süreç genelinde paylaşılan fiyat geçmişi deposu (PRICE_HISTORY_PATH boşsa kapalı)
+    """
+    if not PRICE_HISTORY_PATH:
+        return None
+    history = PriceHistory(PRICE_HISTORY_PATH)
+    # Tampondaki son kayıtlar kapanışta kaybolmasın
+    atexit.register(history.flush)
+    return history
+
+@st.cache_resource
+def get_gold_price_cache():
+    """
+    Tüm oturumlar arasında paylaşılan, süreç genelindeki fiyat önbelleği.
+    Her yeni anlık görüntü fiyat geçmişine de yazılır.
+    """
+    history = get_price_history()
+    return SnapshotCache(
+        lambda: record_gold_snapshot(fetch_gold_snapshot(), history),
+        ttl=GOLD_PRICE_TTL,
+        is_good=lambda snapshot: snapshot['kapali']['success']
+    )
+
+@st.cache_resource
+def get_snapshot_file():
+    """
+    worker.py'nin yayımladığı anlık görüntü dosyası
+    """
+    return SnapshotFile(GOLD_SNAPSHOT_PATH)
 
-def scrape_canli_gram_gold_price():
+def get_gold_snapshot():
     """
-    Canlı Altın Fiyatları'ndan Gram Altın satış fiyatını çeker
+    Sayfa için son fiyat anlık görüntüsü: worker dosyasından ya da paylaşılan önbellekten
     """
+    if GOLD_SNAPSHOT_PATH:
+        return get_snapshot_file().read()
+    return get_gold_price_cache().get()
+
+def gold_price_payload(snapshot):
+    """
+    API yanıtı: türetilmiş fiyatlar ve eski (stale) kaynaklar (veri yoksa None).
+    Anlık görüntünün zamanı gövdede değil başlıklarda gönderilir; fiyatlar değişmedikçe gövde ve ETag aynı kalır.
+    """
+    if not snapshot['kapali']['success']:
+        return None
+    prices = snapshot.get('prices') or derive_gold_prices(snapshot['kapali']['data'], snapshot['canli_gram_satis'])
+    if not prices:
+        return None
+    return {'prices': prices, 'stale': snapshot.get('stale', {})}
+
+@st.cache_resource
+def get_price_api():
+    """
+    Fiyat API'sini süreç başına bir kez başlatır; oturumlarla aynı anlık görüntüyü sunar
+    """
+    if not GOLD_API_PORT:
+        return None
+    # Kaynak nesne burada alınır; API iş parçacıkları Streamlit önbelleğine dokunmaz
+    source = get_snapshot_file().read if GOLD_SNAPSHOT_PATH else get_gold_price_cache().get
     try:
-        url = 'https://canlidoviz.com/altin-fiyatlari'
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-        
-        response = requests.get(url, headers=headers, timeout=10)
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Tablo satırlarını kontrol et
-        table_rows = soup.find_all('tr')
-        
-        for row in table_rows:
-            cells = row.find_all(['td', 'th'])
-            if len(cells) >= 3:
-                name_cell = cells[0].get_text(strip=True)
-                
-                if 'Gram Altın' in name_cell or 'GRAM ALTIN' in name_cell.upper():
-                    try:
-                        satis_text = cells[2].get_text(strip=True).replace(',', '.')
-                        # Sayıları çıkar
-                        numbers = re.findall(r'(\d+\.\d+)', satis_text)
-                        if numbers:
-                            return float(numbers[0])
-                    except (ValueError, IndexError):
-                        continue
-        
+        return serve_price_api(PriceApi(source, gold_price_payload, max_age=GOLD_PRICE_TTL), GOLD_API_HOST, int(GOLD_API_PORT))
+    except OSError as e:
+        print(f"Fiyat API'si başlatılamadı ({GOLD_API_HOST}:{GOLD_API_PORT}): {e}")
         return None
-        
-    except Exception as e:
-        print(f"Canlı gram altın fiyatı çekilemedi: {e}")
+
+def snapshot_age(snapshot):
+    """
+    Anlık görüntünün yaşı (saniye), yoksa None
+    """
+    return time.time() - snapshot['fetched_at'] if snapshot else None
+
+@st.cache_resource
+def get_metrics_server():
+    """
+    Anlık görüntü yaşı metriğini bağlar ve METRICS_PORT ayarlıysa /metrics uç noktasını başlatır
+    """
+    if GOLD_SNAPSHOT_PATH:
+        snapshot_file = get_snapshot_file()
+        SNAPSHOT_AGE.set_function(lambda: snapshot_age(snapshot_file.read()))
+    else:
+        # Önbelleği yenilemeden yalnızca yaşına bakılır
+        SNAPSHOT_AGE.set_function(get_gold_price_cache().age)
+    
+    if not METRICS_PORT:
+        return None
+    try:
+        return serve_metrics(METRICS_HOST, int(METRICS_PORT))
+    except OSError as e:
+        print(f"Metrik uç noktası başlatılamadı ({METRICS_HOST}:{METRICS_PORT}): {e}")
         return None
 
-def calculate_24_ayar_with_data(has_gold_data, canli_gram_satis=None):
+# Fiyat geçmişi grafiği için dönemler: (süre, çözünürlük) saniye cinsinden
+HISTORY_PERIODS = {
+    'Son 1 saat': (3600, 30),
+    'Son 24 saat': (24 * 3600, 60),
+    'Son 7 gün': (7 * 24 * 3600, 15 * 60),
+    'Son 30 gün': (30 * 24 * 3600, 3600)
+}
+
+def render_price_history(history):
     """
-    24 Ayar altın: Kapalıçarşı Has Altın alış + Canlı Gram Altın satış
+    Kayıtlı fiyat geçmişini seçilen dönem için grafik olarak gösterir
     """
-    ayar24_alis = has_gold_data['Alış']
+    period = st.selectbox("Dönem", list(HISTORY_PERIODS), index=1)
+    span, resolution = HISTORY_PERIODS[period]
     
-    # Canlı gram altın satış fiyatını çek
-    if canli_gram_satis is None:
-        canli_gram_satis = scrape_canli_gram_gold_price()
+    now = time.time()
+    df = history.query(now - span, now, resolution)
     
-    ayar24_satis = canli_gram_satis if canli_gram_satis else 0
+    if df.empty:
+        st.info("Henüz kayıtlı fiyat yok.")
+        return
     
-    return {
-        'Hesaplanan 24 Ayar Alış': ayar24_alis,
-        'Hesaplanan 24 Ayar Satış': ayar24_satis
-    }
+    # Kayıtlar UTC; grafik, güncelleme saatiyle aynı yerel saatte gösterilir
+    df['time'] = df['time'].dt.tz_convert(tzlocal()).dt.tz_localize(None)
+    st.line_chart(df.pivot(index='time', columns='product', values='Satış'))
+
+# Vectorized form of each supported operation; unknown operations fall back to multiply
+OPERATIONS = {
+    'multiply': np.multiply,
+    'add': np.add,
+    'subtract': np.subtract,
+    'divide': np.divide
+}
+
+def calculate_results_frame(numbers, multiplier, operation='multiply'):
+    """
+    Apply the operation to all extracted numbers at once.
+    Returns the results DataFrame and the OnlineStats of its results (None when there are no numbers).
+    """
+    values = np.asarray(numbers, dtype=np.float64)
+    
+    if values.size == 0:
+        return pd.DataFrame(columns=['Index', 'Original Value', 'Multiplier/Operand', 'Operation', 'Result']), None
+    
+    if operation == 'divide' and multiplier == 0:
+        # Keep the original behavior: dividing by zero yields inf for every value
+        results = np.full(values.shape, np.inf)
+    else:
+        results = OPERATIONS.get(operation, np.multiply)(values, multiplier)
+    
+    df = pd.DataFrame({
+        'Index': np.arange(1, values.size + 1),
+        'Original Value': values,
+        'Multiplier/Operand': multiplier,
+        'Operation': operation.capitalize(),
+        'Result': results
+    })
+    
+    return df, OnlineStats.from_values(results)
 
 def perform_calculations(numbers, multiplier, operation='multiply'):
     """
-    Perform calculations on the extracted numbers
+    Perform calculations on the extracted numbers (one dict per number)
     """
-    if not numbers:
+    if not len(numbers):
         return []
     
-    results = []
-    for i, num in enumerate(numbers):
-        if operation == 'multiply':
-            result = num * multiplier
-        elif operation == 'add':
-            result = num + multiplier
-        elif operation == 'subtract':
-            result = num - multiplier
-        elif operation == 'divide':
-            result = num / multiplier if multiplier != 0 else float('inf')
+    df, _ = calculate_results_frame(numbers, multiplier, operation)
+    return df.to_dict('records')
+
+def render_batch_extraction(css_selector, operation, multiplier, scrape_options):
+    """
+    Batch extraction UI: many URLs fetched concurrently, results shown as they arrive
+    """
+    urls_text = st.text_area(
+        "URLs (one per line):",
+        placeholder="https://example.com/page-1\nhttps://example.com/page-2",
+        height=150
+    )
+    uploaded = st.file_uploader("...or upload a URL list", type=["txt", "csv"])
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        max_workers = st.number_input("Concurrent requests", min_value=1, max_value=64, value=BATCH_MAX_WORKERS)
+    with col2:
+        per_host_limit = st.number_input("Per-host limit", min_value=1, max_value=32, value=BATCH_PER_HOST_LIMIT)
+    
+    if not st.button("🔍 Extract & Calculate All"):
+        return
+    
+    text = urls_text
+    if uploaded is not None:
+        text += "\n" + uploaded.getvalue().decode('utf-8', errors='replace')
+    urls = parse_url_list(text)
+    
+    invalid = [url for url in urls if not is_valid_url(url)]
+    urls = [url for url in urls if is_valid_url(url)]
+    if invalid:
+        st.warning(f"Skipping {len(invalid)} invalid URL(s): {', '.join(invalid[:5])}{'...' if len(invalid) > 5 else ''}")
+    if not urls:
+        st.error("Please enter at least one valid URL")
+        return
+    
+    progress = st.progress(0.0, text=f"0 / {len(urls)} URLs")
+    table = st.empty()
+    
+    summary = st.empty()
+    
+    finished = 0
+    frames = []
+    errors = []
+    warnings = []
+    # Her URL'nin istatistikleri geldiği anda birleştirilir; tüm sonuçlar yeniden taranmaz
+    batch_stats = OnlineStats()
+    last_draw = 0.0
+    for url, result in scrape_websites(urls, css_selector, int(max_workers), int(per_host_limit), **scrape_options):
+        finished += 1
+        if not result['success']:
+            errors.append((url, result['error']))
+        warnings.extend((url, warning) for warning in result.get('warnings', []))
+        df, stats = batch_result_frame(url, result, multiplier, operation)
+        if df is not None:
+            frames.append(df)
+            batch_stats.merge(stats)
+        
+        progress.progress(finished / len(urls), text=f"{finished} / {len(urls)} URLs")
+        # Kısmi sonuçları en fazla yarım saniyede bir çiz
+        if time.time() - last_draw > 0.5 or finished == len(urls):
+            table.dataframe(batch_results_frame(frames), use_container_width=True)
+            with summary.container():
+                render_result_statistics(batch_stats)
+            last_draw = time.time()
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("URLs", len(urls))
+    with col2:
+        st.metric("Failed", len(errors))
+    
+    if errors:
+        with st.expander(f"❌ {len(errors)} failed URL(s)"):
+            st.dataframe(pd.DataFrame(errors, columns=['Source URL', 'Error']), use_container_width=True)
+    if warnings:
+        with st.expander(f"⚠️ {len(warnings)} warning(s)"):
+            st.dataframe(pd.DataFrame(warnings, columns=['Source URL', 'Warning']), use_container_width=True)
+
+def update_gold_cards(cards_placeholder, snapshot, kapali_result):
+    """
+    Fiyatları türetip kartları (ya da hata mesajını) yer tutucuya yazar; içerik aynıysa tekrar göndermez
+    """
+    if not kapali_result['success']:
+        content = ('error', f"Veri çekme hatası: {kapali_result['error']}")
+    elif 'Has Altın' not in kapali_result['data']:
+        content = ('error', "Has Altın verileri bulunamadı.")
+    else:
+        prices = derive_gold_prices(kapali_result['data'], snapshot['canli_gram_satis'])
+        content = ('cards', render_gold_card_grid(gold_panel_rows(prices)))
+    
+    if st.session_state.get('gold_panel_content') != content:
+        kind, payload = content
+        if kind == 'error':
+            cards_placeholder.error(payload)
         else:
-            result = num * multiplier  # Default to multiply
+            cards_placeholder.markdown(payload, unsafe_allow_html=True)
+        st.session_state.gold_panel_content = content
+        PANEL_UPDATES.inc(result='rendered')
+    else:
+        PANEL_UPDATES.inc(result='skipped')
+
+def change_detection_summary():
+    """
+    Değişiklik algılamanın kazancı: yapılan/atlanan sayfa ayrıştırmaları, panel çizimleri
+    ve süren bir çağrıya katılan kaynak çağrıları (süreç geneli)
+    """
+    parsed = PARSE_RESULTS.total(result='parsed')
+    reused = PARSE_RESULTS.total(result='not_modified') + PARSE_RESULTS.total(result='fingerprint')
+    rendered = PANEL_UPDATES.total(result='rendered')
+    skipped = PANEL_UPDATES.total(result='skipped')
+    return (
+        f"🔁 Sayfa ayrıştırma: {parsed} yapıldı, {reused} atlandı · Panel: {rendered} çizildi, {skipped} atlandı"
+        f" · Birleştirilen kaynak çağrısı: {SOURCE_FLIGHTS.coalesced()}"
+    )
+
+@STAGE_SECONDS.time(stage='render_panel')
+def render_gold_panel(cards_placeholder, caption_placeholder):
+    """
+    Altın fiyatları paneli. main() bunu zamanlayıcılı bir fragment olarak çalıştırır;
+    yenilemede yalnızca bu panel yeniden çizilir, sayfanın geri kalanı değil.
+    Kartlar fragment dışındaki bir yer tutucuya tek seferde yazılır. Anlık görüntünün
+    parmak izi öncekiyle aynıysa fiyatlar yeniden türetilmez ve kartlar tekrar gönderilmez.
+    """
+    # Son fiyatları worker dosyasından ya da paylaşılan önbellekten al (eskiyse arka planda yenilenir)
+    snapshot = get_gold_snapshot()
+    kapali_result = snapshot['kapali'] if snapshot else {'success': False, 'error': "Fiyat verisi henüz yayımlanmadı."}
+    fingerprint = snapshot.get('fingerprint') if snapshot else None
+    
+    if fingerprint is not None and st.session_state.get('gold_panel_fingerprint') == fingerprint:
+        PANEL_UPDATES.inc(result='skipped')
+    else:
+        update_gold_cards(cards_placeholder, snapshot, kapali_result)
+        st.session_state.gold_panel_fingerprint = fingerprint
+    
+    if kapali_result['success']:
+        # Son güncelleme zamanı
+        fetched_at = pd.Timestamp.fromtimestamp(snapshot['fetched_at'])
+        caption = f"Son güncelleme: {fetched_at.strftime('%H:%M:%S')}"
+        # Yanıt vermeyen kaynaklar için son geçerli verinin zamanı gösterilir
+        labels = {adapter.name: adapter.label for adapter in source_adapters()}
+        for source, stale_at in snapshot.get('stale', {}).items():
+            stale_time = pd.Timestamp.fromtimestamp(stale_at).strftime('%H:%M:%S')
+            caption += f" · ⚠️ {labels.get(source, source)} yanıt vermiyor, {stale_time} verisi gösteriliyor"
+        caption_placeholder.caption(caption)
+    else:
+        caption_placeholder.empty()
+
+def format_statistic(value):
+    return "–" if value is None else f"{value:.2f}"
+
+def render_result_statistics(stats):
+    """
+    Summary metrics of the results, from an OnlineStats accumulator
+    """
+    summary = stats.summary()
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Total Numbers", summary['count'])
+    with col2:
+        st.metric("Sum of Results", format_statistic(summary['sum']))
+    with col3:
+        st.metric("Average Result", format_statistic(summary['mean']))
+    with col4:
+        st.metric("Max Result", format_statistic(summary['max']))
+    
+    col1, col2, col3, col4, col5 = st.columns(5)
+    with col1:
+        st.metric("Min Result", format_statistic(summary['min']))
+    with col2:
+        st.metric("Std. Deviation", format_statistic(summary['std']))
+    with col3:
+        st.metric("Median (p50)", format_statistic(summary['p50']))
+    with col4:
+        st.metric("p95", format_statistic(summary['p95']))
+    with col5:
+        st.metric("p99", format_statistic(summary['p99']))
+    st.caption(f"Percentiles are nearest-rank estimates, accurate to within {stats.sketch.relative_accuracy:.0%}.")
+
+def render_extraction(extraction):
+    """
+    Show the results of the last extraction
+    """
+    result, df, stats = extraction['result'], extraction['df'], extraction['stats']
+    
+    for warning in result.get('warnings', []):
+        st.warning(warning)
+    
+    # Display extraction results
+    st.success(f"✅ Successfully extracted {result['total_numbers_found']} numerical values")
+    
+    if result.get('truncated'):
+        st.info(f"Stopped at the size limits after reading {result['bytes_read']:,} bytes.")
+    
+    if result['total_numbers_found'] == 0:
+        st.warning("No numerical data found on the specified website or section.")
+        st.info("**Text sample from the page:**")
+        st.text_area("Sample content:", result['text_sample'], height=150)
+        return
+    
+    # Show sample of extracted text
+    with st.expander("📄 View extracted text sample"):
+        st.text_area("Content sample:", result['text_sample'], height=150)
+    
+    if stats is not None:
+        # Display results
+        st.header("4. 📊 Calculation Results")
+        st.dataframe(df, use_container_width=True)
         
-        results.append({
-            'Index': i + 1,
-            'Original Value': num,
-            'Multiplier/Operand': multiplier,
-            'Operation': operation.capitalize(),
-            'Result': result
-        })
+        render_result_statistics(stats)
+        
+        render_export(df, extraction['id'])
+
+def render_export(df, extraction_id):
+    """
+    Export section. The file is only encoded when "Prepare download" is
+    clicked, and only the prepared file is handed to the download button.
+    """
+    st.header("5. 💾 Export Results")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        fmt = st.selectbox(
+            "Format",
+            available_formats(),
+            format_func=lambda name: EXPORT_FORMATS[name][0],
+            key='export_format'
+        )
+    label, mime, extension = EXPORT_FORMATS[fmt]
+    
+    with col2:
+        if st.button("⚙️ Prepare download"):
+            with st.spinner(f"Building {label} file..."):
+                st.session_state.export = {
+                    'extraction_id': extraction_id,
+                    'format': fmt,
+                    'data': export_bytes(df, fmt),
+                    'file_name': f"extracted_data_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+                }
+        
+        prepared = st.session_state.get('export')
+        if prepared and prepared['extraction_id'] == extraction_id and prepared['format'] == fmt:
+            st.download_button(
+                label=f"📥 Download as {label}",
+                data=prepared['data'],
+                file_name=prepared['file_name'],
+                mime=mime,
+                on_click='ignore'
+            )
     
-    return results
+    if len(available_formats()) < len(EXPORT_FORMATS):
+        st.caption("Install pyarrow for Parquet and Arrow exports.")
 
 def main():
+    # Aşağı akış uygulamaları için JSON fiyat API'si ve metrik uç noktası (açıksa)
+    get_price_api()
+    get_metrics_server()
+    
     st.title("🌐 Website Data Extractor & Calculator")
     st.markdown("Extract numerical data from websites and perform calculations")
     
     # Sidebar for settings
     st.sidebar.header("⚙️ Settings")
+    streaming = st.sidebar.checkbox(
+        "Streaming mode",
+        help="Read the page in chunks and stop at the limits below. Keeps memory low on huge pages; CSS selectors are ignored."
+    )
+    bounded = st.sidebar.checkbox(
+        "Memory-bounded mode",
+        disabled=streaming,
+        help="Cap the page at the limits below and free it as soon as the numbers are extracted. CSS selectors still work."
+    )
+    limited = streaming or bounded
+    max_page_mb = st.sidebar.number_input(
+        "Max page size (MB)",
+        min_value=1,
+        value=STREAM_MAX_BYTES // (1024 * 1024),
+        disabled=not limited
+    )
+    max_numbers = st.sidebar.number_input(
+        "Max numbers",
+        min_value=1,
+        value=STREAM_MAX_NUMBERS,
+        step=1000,
+        disabled=not limited
+    )
+    number_locale = st.sidebar.selectbox(
+        "Number format",
+        list(LOCALES),
+        index=list(LOCALES).index(NUMBER_LOCALE) if NUMBER_LOCALE in LOCALES else 0,
+        format_func=lambda name: NUMBER_FORMAT_LABELS.get(name, name),
+        help="Thousands and decimal separators used when reading numbers from the page"
+    )
+    refresh_interval = st.sidebar.number_input(
+        "Altın fiyatı yenileme (sn)",
+        min_value=5,
+        value=GOLD_REFRESH_INTERVAL,
+        help="Altın fiyatları panelinin kendiliğinden yenilenme aralığı"
+    )
+    st.sidebar.caption(change_detection_summary())
     
     # Responsive CSS
     st.markdown("""
@@ -551,181 +1329,19 @@ def main():
     # Altın Fiyatları başlığı
     st.header("🏛️ Altın Fiyatları")
     
-    # Otomatik veri çekme ve hesaplama
-    kapali_result = scrape_kapalicarsi_gold_prices()
+    # Altın fiyatları paneli kendi zamanlayıcısıyla yenilenir (tüm sayfa yeniden çalışmaz).
+    # Stil sayfası ve yer tutucular yalnızca tam sayfa çalışmasında oluşturulur.
+    st.markdown(GOLD_PANEL_STYLESHEET, unsafe_allow_html=True)
+    cards_placeholder = st.empty()
+    caption_placeholder = st.empty()
+    st.session_state.gold_panel_content = None
+    st.session_state.gold_panel_fingerprint = None
+    st.fragment(render_gold_panel, run_every=refresh_interval)(cards_placeholder, caption_placeholder)
     
-    if kapali_result['success']:
-        data = kapali_result['data']
-        
-        if 'Has Altın' in data:
-            # Çeyrek altın hesaplama (alış x1.59, satış x1.60)
-            ceyrek_calculation = calculate_ceyrek_with_has_gold(data['Has Altın'], 1.59, 1.60)
-            
-            # Yarım altın hesaplama (çeyrek x2)
-            yarim_calculation = calculate_yarim_with_ceyrek(ceyrek_calculation)
-            
-            # Tam altın hesaplama (yarım x2)
-            tam_calculation = calculate_tam_with_yarim(yarim_calculation)
-            
-            # Cumhuriyet altın hesaplama (Cumhuriyet altın - 180 TL)
-            cumhuriyet_calculation = None
-            if 'Cumhuriyet Altın' in data:
-                cumhuriyet_calculation = calculate_cumhuriyet_with_market_data(data['Cumhuriyet Altın'])
-            
-            # 24 Ayar altın hesaplama (Kapalıçarşı Has Altın alış + Canlı Gram Altın satış)
-            ayar24_calculation = None
-            if 'Has Altın' in data:
-                ayar24_calculation = calculate_24_ayar_with_data(data['Has Altın'])
-            
-            # Çeyrek Altın - 2x2 düzen
-            st.markdown("<h3 style='text-align: center; color: white;'>Çeyrek Altın</h3>", unsafe_allow_html=True)
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.markdown("""
-                <div style="background: #ff8c42; border-radius: 8px; padding: 15px; text-align: center; 
-                           margin: 2px; box-shadow: 0 2px 8px rgba(0,0,0,0.1);">
-                    <h5 style="margin: 0 0 10px 0; color: black; font-size: 16px; font-weight: bold;">Alış</h5>
-                    <div style="font-size: 20px; font-weight: 900; color: black;">
-                        {:.2f} TL
-                    </div>
-                </div>
-                """.format(ceyrek_calculation['Hesaplanan Çeyrek Alış']), unsafe_allow_html=True)
-            
-            with col2:
-                st.markdown("""
-                <div style="background: #ff8c42; border-radius: 8px; padding: 15px; text-align: center; 
-                           margin: 2px; box-shadow: 0 2px 8px rgba(0,0,0,0.1);">
-                    <h5 style="margin: 0 0 10px 0; color: black; font-size: 16px; font-weight: bold;">Satış</h5>
-                    <div style="font-size: 20px; font-weight: 900; color: black;">
-                        {:.2f} TL
-                    </div>
-                </div>
-                """.format(ceyrek_calculation['Hesaplanan Çeyrek Satış']), unsafe_allow_html=True)
-            
-            # Yarım Altın - 2x2 düzen
-            st.markdown("<h3 style='text-align: center; color: white;'>Yarım Altın</h3>", unsafe_allow_html=True)
-            col3, col4 = st.columns(2)
-            
-            with col3:
-                st.markdown("""
-                <div style="background: #ff8c42; border-radius: 8px; padding: 15px; text-align: center; 
-                           margin: 2px; box-shadow: 0 2px 8px rgba(0,0,0,0.1);">
-                    <h5 style="margin: 0 0 10px 0; color: black; font-size: 16px; font-weight: bold;">Alış</h5>
-                    <div style="font-size: 20px; font-weight: 900; color: black;">
-                        {:.2f} TL
-                    </div>
-                </div>
-                """.format(yarim_calculation['Hesaplanan Yarım Alış']), unsafe_allow_html=True)
-            
-            with col4:
-                st.markdown("""
-                <div style="background: #ff8c42; border-radius: 8px; padding: 15px; text-align: center; 
-                           margin: 2px; box-shadow: 0 2px 8px rgba(0,0,0,0.1);">
-                    <h5 style="margin: 0 0 10px 0; color: black; font-size: 16px; font-weight: bold;">Satış</h5>
-                    <div style="font-size: 20px; font-weight: 900; color: black;">
-                        {:.2f} TL
-                    </div>
-                </div>
-                """.format(yarim_calculation['Hesaplanan Yarım Satış']), unsafe_allow_html=True)
-            
-            # Tam Altın - 2x2 düzen
-            st.markdown("<h3 style='text-align: center; color: white;'>Tam Altın</h3>", unsafe_allow_html=True)
-            col5, col6 = st.columns(2)
-            
-            with col5:
-                st.markdown("""
-                <div style="background: #ff8c42; border-radius: 8px; padding: 15px; text-align: center; 
-                           margin: 2px; box-shadow: 0 2px 8px rgba(0,0,0,0.1);">
-                    <h5 style="margin: 0 0 10px 0; color: black; font-size: 16px; font-weight: bold;">Alış</h5>
-                    <div style="font-size: 20px; font-weight: 900; color: black;">
-                        {:.2f} TL
-                    </div>
-                </div>
-                """.format(tam_calculation['Hesaplanan Tam Alış']), unsafe_allow_html=True)
-            
-            with col6:
-                st.markdown("""
-                <div style="background: #ff8c42; border-radius: 8px; padding: 15px; text-align: center; 
-                           margin: 2px; box-shadow: 0 2px 8px rgba(0,0,0,0.1);">
-                    <h5 style="margin: 0 0 10px 0; color: black; font-size: 16px; font-weight: bold;">Satış</h5>
-                    <div style="font-size: 20px; font-weight: 900; color: black;">
-                        {:.2f} TL
-                    </div>
-                </div>
-                """.format(tam_calculation['Hesaplanan Tam Satış']), unsafe_allow_html=True)
-            
-            # Cumhuriyet Altın - 2x2 düzen (sadece Ata altın varsa göster)
-            if cumhuriyet_calculation:
-                st.markdown("<h3 style='text-align: center; color: white;'>Cumhuriyet Altın</h3>", unsafe_allow_html=True)
-                col7, col8 = st.columns(2)
-                
-                with col7:
-                    st.markdown("""
-                    <div style="background: #ff8c42; border-radius: 8px; padding: 15px; text-align: center; 
-                               margin: 2px; box-shadow: 0 2px 8px rgba(0,0,0,0.1);">
-                        <h5 style="margin: 0 0 10px 0; color: black; font-size: 16px; font-weight: bold;">Alış</h5>
-                        <div style="font-size: 20px; font-weight: 900; color: black;">
-                            {:.2f} TL
-                        </div>
-                    </div>
-                    """.format(cumhuriyet_calculation['Hesaplanan Cumhuriyet Alış']), unsafe_allow_html=True)
-                
-                with col8:
-                    st.markdown("""
-                    <div style="background: #ff8c42; border-radius: 8px; padding: 15px; text-align: center; 
-                               margin: 2px; box-shadow: 0 2px 8px rgba(0,0,0,0.1);">
-                        <h5 style="margin: 0 0 10px 0; color: black; font-size: 16px; font-weight: bold;">Satış</h5>
-                        <div style="font-size: 20px; font-weight: 900; color: black;">
-                            {:.2f} TL
-                        </div>
-                    </div>
-                    """.format(cumhuriyet_calculation['Hesaplanan Cumhuriyet Satış']), unsafe_allow_html=True)
-            
-            # 24 Ayar Altın - 2x2 düzen (Has Altın + Gram Altın varsa göster)
-            if ayar24_calculation:
-                st.markdown("<h3 style='text-align: center; color: white;'>24 Ayar Altın</h3>", unsafe_allow_html=True)
-                col9, col10 = st.columns(2)
-                
-                with col9:
-                    st.markdown("""
-                    <div style="background: #ff8c42; border-radius: 8px; padding: 15px; text-align: center; 
-                               margin: 2px; box-shadow: 0 2px 8px rgba(0,0,0,0.1);">
-                        <h5 style="margin: 0 0 10px 0; color: black; font-size: 16px; font-weight: bold;">Alış</h5>
-                        <div style="font-size: 20px; font-weight: 900; color: black;">
-                            {:.2f} TL
-                        </div>
-                    </div>
-                    """.format(ayar24_calculation['Hesaplanan 24 Ayar Alış']), unsafe_allow_html=True)
-                
-                with col10:
-                    st.markdown("""
-                    <div style="background: #ff8c42; border-radius: 8px; padding: 15px; text-align: center; 
-                               margin: 2px; box-shadow: 0 2px 8px rgba(0,0,0,0.1);">
-                        <h5 style="margin: 0 0 10px 0; color: black; font-size: 16px; font-weight: bold;">Satış</h5>
-                        <div style="font-size: 20px; font-weight: 900; color: black;">
-                            {:.2f} TL
-                        </div>
-                    </div>
-                    """.format(ayar24_calculation['Hesaplanan 24 Ayar Satış']), unsafe_allow_html=True)
-            
-            # Son güncelleme zamanı
-            st.caption(f"Son güncelleme: {pd.Timestamp.now().strftime('%H:%M:%S')}")
-            
-            # Otomatik yenileme
-            import time
-            if "last_update" not in st.session_state:
-                st.session_state.last_update = time.time()
-            
-            # 30 saniyede bir otomatik yenile
-            if time.time() - st.session_state.last_update > 30:
-                st.session_state.last_update = time.time()
-                st.rerun()
-            
-        else:
-            st.error("Has Altın verileri bulunamadı.")
-    else:
-        st.error(f"Veri çekme hatası: {kapali_result['error']}")
+    history = get_price_history()
+    if history is not None:
+        with st.expander("📈 Fiyat Geçmişi"):
+            render_price_history(history)
     
     st.divider()
     
@@ -764,8 +1380,22 @@ def main():
             help="The value to use in the calculation"
         )
     
+    scrape_options = {
+        'streaming': streaming,
+        'bounded': bounded and not streaming,
+        'max_bytes': int(max_page_mb) * 1024 * 1024,
+        'max_numbers': int(max_numbers),
+        'number_locale': number_locale
+    }
+    
+    with st.expander("📚 Batch extraction (multiple URLs)"):
+        render_batch_extraction(css_selector, operation, multiplier, scrape_options)
+    
     # Process button
     if st.button("🔍 Extract & Calculate", type="primary"):
+        st.session_state.extraction = None
+        st.session_state.export = None
+        
         if not url:
             st.error("Please enter a URL")
             return
@@ -776,75 +1406,21 @@ def main():
         
         # Show progress
         with st.spinner("Extracting data from website..."):
-            result = scrape_website_data(url, css_selector)
+            result = scrape_website_data(url, css_selector, **scrape_options)
         
         if not result['success']:
             st.error(f"❌ {result['error']}")
             return
         
-        # Display extraction results
-        st.success(f"✅ Successfully extracted {result['total_numbers_found']} numerical values")
-        
-        if result['total_numbers_found'] == 0:
-            st.warning("No numerical data found on the specified website or section.")
-            st.info("**Text sample from the page:**")
-            st.text_area("Sample content:", result['text_sample'], height=150)
-            return
-        
-        # Show sample of extracted text
-        with st.expander("📄 View extracted text sample"):
-            st.text_area("Content sample:", result['text_sample'], height=150)
-        
         # Perform calculations
-        calculations = perform_calculations(result['numbers'], multiplier, operation)
+        df, stats = calculate_results_frame(result['numbers'], multiplier, operation)
         
-        if calculations:
-            # Create DataFrame
-            df = pd.DataFrame(calculations)
-            
-            # Display results
-            st.header("4. 📊 Calculation Results")
-            st.dataframe(df, use_container_width=True)
-            
-            # Statistics
-            col1, col2, col3, col4 = st.columns(4)
-            with col1:
-                st.metric("Total Numbers", len(calculations))
-            with col2:
-                st.metric("Sum of Results", f"{sum([calc['Result'] for calc in calculations]):.2f}")
-            with col3:
-                st.metric("Average Result", f"{np.mean([calc['Result'] for calc in calculations]):.2f}")
-            with col4:
-                st.metric("Max Result", f"{max([calc['Result'] for calc in calculations]):.2f}")
-            
-            # Export functionality
-            st.header("5. 💾 Export Results")
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                # CSV download
-                csv_buffer = io.StringIO()
-                df.to_csv(csv_buffer, index=False)
-                csv_data = csv_buffer.getvalue()
-                
-                st.download_button(
-                    label="📥 Download as CSV",
-                    data=csv_data,
-                    file_name=f"extracted_data_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                    mime="text/csv"
-                )
-            
-            with col2:
-                # JSON download
-                json_data = df.to_json(orient='records', indent=2)
-                
-                st.download_button(
-                    label="📥 Download as JSON",
-                    data=json_data,
-                    file_name=f"extracted_data_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.json",
-                    mime="application/json"
-                )
+        # Kept for the reruns triggered by the export buttons
+        st.session_state.extraction = {'id': time.time_ns(), 'result': result, 'df': df, 'stats': stats}
+    
+    extraction = st.session_state.get('extraction')
+    if extraction is not None:
+        render_extraction(extraction)
     
     # Help section
     with st.expander("ℹ️ How to use this application"):
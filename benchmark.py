@@ -0,0 +1,767 @@
+"""
+Offline benchmarks for the scrape -> parse -> compute -> render pipeline.
+
+Usage:
+    python benchmark.py                      # parser comparison + scaling stress
+    python benchmark.py pricing              # rule engine vs. the calculate_* chain
+    python benchmark.py tokenizer            # numeric.parse_numbers vs. the regex + float() loop
+    python benchmark.py stats                # chunked, merged OnlineStats vs. exact NumPy statistics
+    python benchmark.py suite                # per-stage suite, writes benchmark_results.json
+    python benchmark.py suite --max-size 10MB --output results.json --baseline previous.json
+
+Runs against the saved pages in fixtures/ and synthetic pages built from them,
+so no network access is needed.
+"""
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import platform
+import re
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from bs4 import BeautifulSoup
+
+try:
+    import resource
+except ImportError:  # Windows: no peak RSS
+    resource = None
+
+import app
+import numeric
+import pricing
+from online_stats import OnlineStats
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def load_fixture(name):
+    """
+    Read a saved HTML page from fixtures/
+    """
+    with open(os.path.join(FIXTURES_DIR, name), 'rb') as f:
+        return f.read()
+
+
+def make_large_page(html, target_bytes):
+    """
+    Pad a saved page with filler paragraphs (text, prices, "ata"-like words)
+    in front of the price table until it is roughly `target_bytes` long
+    """
+    filler = (
+        '<p>Piyasa notu: kapanış 1234.56, data 78.90, katalog %0.25 artış, '
+        'Hatay ve Antalya fiyatları 4321.00 seviyesinde.</p>\n'
+    ).encode('utf-8')
+    missing = max(0, target_bytes - len(html))
+    padding = filler * (missing // len(filler) + 1)
+    marker = html.find(b'<table')
+    if marker == -1:
+        marker = len(html)
+    return html[:marker] + padding[:missing] + html[marker:]
+
+
+def legacy_parse_kapalicarsi_gold_prices(html):
+    """
+    Baseline parser (full tree, DOTALL regex scans, then a second <tr> walk), kept for comparison
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    
+    # Sayfa içeriğinden altın fiyatlarını regex ile çek
+    page_text = soup.get_text()
+    
+    gold_data = legacy_scan_page_text(page_text)
+    
+    # Alternatif olarak tablo verilerini de dene
+    table_rows = soup.find_all('tr')
+    
+    for row in table_rows:
+        cells = row.find_all('td')
+        if len(cells) >= 3:
+            name_cell = cells[0].get_text(strip=True)
+            
+            if 'Has Altın' in name_cell or 'XHGLD' in name_cell:
+                try:
+                    alis_text = cells[1].get_text(strip=True).replace(',', '.')
+                    satis_text = cells[2].get_text(strip=True).split()[0].replace(',', '.')
+                    alis_fiyat = float(alis_text)
+                    satis_fiyat = float(satis_text)
+                    gold_data['Has Altın'] = {
+                        'Alış': alis_fiyat,
+                        'Satış': satis_fiyat
+                    }
+                except (ValueError, IndexError):
+                    continue
+            
+            elif 'Çeyrek Altın' in name_cell and 'Eski' not in name_cell:
+                try:
+                    alis_text = cells[1].get_text(strip=True).replace(',', '.')
+                    satis_text = cells[2].get_text(strip=True).split()[0].replace(',', '.')
+                    alis_fiyat = float(alis_text)
+                    satis_fiyat = float(satis_text)
+                    gold_data['Çeyrek Altın'] = {
+                        'Alış': alis_fiyat,
+                        'Satış': satis_fiyat
+                    }
+                except (ValueError, IndexError):
+                    continue
+                    
+            elif any(keyword in name_cell.upper() for keyword in ['CUMHURIYET', 'ATA']):
+                try:
+                    alis_text = cells[1].get_text(strip=True).replace(',', '.')
+                    satis_text = cells[2].get_text(strip=True).split()[0].replace(',', '.')
+                    alis_fiyat = float(alis_text)
+                    satis_fiyat = float(satis_text)
+                    gold_data['Cumhuriyet Altın'] = {
+                        'Alış': alis_fiyat,
+                        'Satış': satis_fiyat
+                    }
+                except (ValueError, IndexError):
+                    continue
+                    
+            elif any(keyword in name_cell.upper() for keyword in ['GRAM', 'GA']):
+                try:
+                    # Özel format kontrolü: "GAGram Altın05/07/25" gibi
+                    if 'GA' in name_cell and 'Gram' in name_cell:
+                        alis_text = cells[1].get_text(strip=True).replace(',', '.')
+                        # Satış fiyatı bazen "4286.520.00%0.00" formatında olabilir
+                        satis_raw = cells[2].get_text(strip=True)
+                        # İlk sayıyı al (% işaretinden önceki kısım)
+                        satis_text = re.split(r'[%\s]', satis_raw)[0].replace(',', '.')
+                        
+                        alis_fiyat = float(alis_text)
+                        satis_fiyat = float(satis_text)
+                        gold_data['Gram Altın'] = {
+                            'Alış': alis_fiyat,
+                            'Satış': satis_fiyat
+                        }
+                    else:
+                        # Normal format
+                        alis_text = cells[1].get_text(strip=True).replace(',', '.')
+                        satis_text = cells[2].get_text(strip=True).split()[0].replace(',', '.')
+                        alis_fiyat = float(alis_text)
+                        satis_fiyat = float(satis_text)
+                        gold_data['Gram Altın'] = {
+                            'Alış': alis_fiyat,
+                            'Satış': satis_fiyat
+                        }
+                except (ValueError, IndexError):
+                    continue
+    
+    return gold_data
+
+
+def legacy_scan_page_text(page_text):
+    """
+    Baseline DOTALL regex scans over the flattened page text
+    """
+    gold_data = {}
+    
+    # Has Altın için regex pattern
+    has_altin_pattern = r'Has Altın.*?(\d+\.\d+).*?(\d+\.\d+)'
+    has_match = re.search(has_altin_pattern, page_text, re.DOTALL)
+    
+    if has_match:
+        try:
+            alis = float(has_match.group(1))
+            satis = float(has_match.group(2))
+            gold_data['Has Altın'] = {
+                'Alış': alis,
+                'Satış': satis
+            }
+        except ValueError:
+            pass
+    
+    # Cumhuriyet/Ata Altın için regex pattern (çeşitli yazım şekilleri)
+    cumhuriyet_patterns = [
+        r'Cumhuriyet.*?(\d+\.\d+).*?(\d+\.\d+)',
+        r'cumhuriyet.*?(\d+\.\d+).*?(\d+\.\d+)',
+        r'Ata.*?(\d+\.\d+).*?(\d+\.\d+)',
+        r'ata.*?(\d+\.\d+).*?(\d+\.\d+)',
+        r'ATA.*?(\d+\.\d+).*?(\d+\.\d+)'
+    ]
+    
+    for pattern in cumhuriyet_patterns:
+        cumhuriyet_match = re.search(pattern, page_text, re.DOTALL | re.IGNORECASE)
+        if cumhuriyet_match:
+            try:
+                alis = float(cumhuriyet_match.group(1))
+                satis = float(cumhuriyet_match.group(2))
+                gold_data['Cumhuriyet Altın'] = {
+                    'Alış': alis,
+                    'Satış': satis
+                }
+                break
+            except ValueError:
+                continue
+    
+    # Gram Altın için regex pattern
+    gram_patterns = [
+        r'Gram.*?Altın.*?(\d+\.\d+).*?(\d+\.\d+)',
+        r'gram.*?altın.*?(\d+\.\d+).*?(\d+\.\d+)',
+        r'GRAM.*?ALTIN.*?(\d+\.\d+).*?(\d+\.\d+)'
+    ]
+    
+    for pattern in gram_patterns:
+        gram_match = re.search(pattern, page_text, re.DOTALL | re.IGNORECASE)
+        if gram_match:
+            try:
+                alis = float(gram_match.group(1))
+                satis = float(gram_match.group(2))
+                gold_data['Gram Altın'] = {
+                    'Alış': alis,
+                    'Satış': satis
+                }
+                break
+            except ValueError:
+                continue
+    
+    # Çeyrek Altın için regex pattern  
+    ceyrek_pattern = r'Çeyrek Altın(?!.*Eski).*?(\d+\.\d+).*?(\d+\.\d+)'
+    ceyrek_match = re.search(ceyrek_pattern, page_text, re.DOTALL)
+    
+    if ceyrek_match:
+        try:
+            alis = float(ceyrek_match.group(1))
+            satis = float(ceyrek_match.group(2))
+            gold_data['Çeyrek Altın'] = {
+                'Alış': alis,
+                'Satış': satis
+            }
+        except ValueError:
+            pass
+    
+    return gold_data
+
+
+def time_call(func, *args, repeat=5):
+    """
+    Best-of-`repeat` wall time of func(*args) in seconds, plus the last result
+    """
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench_kapalicarsi_parser(sizes=(0, 100_000, 1_000_000)):
+    """
+    Compare the single-pass table parser with the baseline regex parser
+    """
+    base = load_fixture('kapali_carsi.html')
+    print(f"{'page size':>12} {'legacy (ms)':>12} {'current (ms)':>13} {'speedup':>8}")
+
+    for size in sizes:
+        html = make_large_page(base, size) if size else base
+        repeat = 5 if len(html) < 500_000 else 2
+        legacy_time, legacy_result = time_call(legacy_parse_kapalicarsi_gold_prices, html, repeat=repeat)
+        current_time, current_result = time_call(app.parse_kapalicarsi_gold_prices, html, repeat=repeat)
+
+        if legacy_result != current_result:
+            print(f"Result mismatch at {len(html)} bytes:\n  legacy:  {legacy_result}\n  current: {current_result}")
+            sys.exit(1)
+
+        print(f"{len(html):>12,} {legacy_time * 1000:>12.2f} {current_time * 1000:>13.2f} {legacy_time / current_time:>7.1f}x")
+
+
+def make_adversarial_text(target_bytes):
+    """
+    Page text full of product labels, "ata"-like words and lone numbers but no
+    price pairs: the worst case for unbounded `.*?` / `(?!.*Eski)` scans
+    """
+    chunk = 'Çeyrek Altın ata data Hatay katalog 12 Has Altın 7 Gram Altın '
+    return (chunk * (target_bytes // len(chunk) + 1))[:target_bytes]
+
+
+def bench_page_text_scaling(sizes=(1_000_000, 2_000_000, 4_000_000, 8_000_000), legacy_sizes=(1_000, 2_000, 4_000)):
+    """
+    Stress the page-text fallback on multi-megabyte adversarial text and check
+    that time per byte stays flat (linear scaling). Exits non-zero otherwise.
+    """
+    print(f"\n{'text size':>12} {'current (ms)':>13} {'ns/byte':>8}")
+    per_byte = []
+    for size in sizes:
+        text = make_adversarial_text(size)
+        elapsed, _ = time_call(app.extract_prices_from_page_text, text, float('inf'), repeat=2)
+        per_byte.append(elapsed / size)
+        print(f"{size:>12,} {elapsed * 1000:>13.1f} {elapsed / size * 1e9:>8.1f}")
+
+    print(f"\n{'text size':>12} {'legacy (ms)':>12} {'ns/byte':>8}")
+    for size in legacy_sizes:
+        text = make_adversarial_text(size)
+        elapsed, _ = time_call(legacy_scan_page_text, text, repeat=1)
+        print(f"{size:>12,} {elapsed * 1000:>12.1f} {elapsed / size * 1e9:>8.1f}")
+
+    growth = max(per_byte) / min(per_byte)
+    print(f"\nCurrent scanner time-per-byte spread over {sizes[0]:,}-{sizes[-1]:,} bytes: {growth:.2f}x")
+    if growth > 3:
+        print("Page-text scan is not scaling linearly")
+        sys.exit(1)
+
+
+def legacy_derive_gold_prices(gold_data, canli_gram_satis=None):
+    """
+    Baseline chain of calculate_* steps (Has -> Çeyrek -> Yarım -> Tam, Cumhuriyet, 24 Ayar), kept for comparison
+    """
+    has = gold_data['Has Altın']
+    ceyrek = {'Alış': has['Alış'] * 1.59, 'Satış': has['Satış'] * 1.60}
+    yarim = {'Alış': ceyrek['Alış'] * 2, 'Satış': ceyrek['Satış'] * 2}
+    tam = {'Alış': yarim['Alış'] * 2, 'Satış': yarim['Satış'] * 2}
+    prices = {'Has Altın': has, 'Çeyrek Altın': ceyrek, 'Yarım Altın': yarim, 'Tam Altın': tam}
+    if 'Cumhuriyet Altın' in gold_data:
+        cumhuriyet = gold_data['Cumhuriyet Altın']
+        prices['Cumhuriyet Altın'] = {'Alış': cumhuriyet['Alış'] - 180, 'Satış': cumhuriyet['Satış'] - 180}
+    prices['24 Ayar Altın'] = {'Alış': has['Alış'], 'Satış': canli_gram_satis or None}
+    return prices
+
+
+def bench_pricing_engine(ticks=100_000):
+    """
+    Derive every product for a synthetic price history: the baseline chain
+    tick by tick vs. one vectorized rule-engine pass, plus incremental updates
+    """
+    engine = pricing.get_pricing_engine()
+    rng = np.random.default_rng(0)
+    has = 3000 + rng.random(ticks) * 50
+    cumhuriyet = has * 6.6 + rng.random(ticks) * 20
+    gram = has * 1.02
+
+    frame = pd.DataFrame({
+        'Has Altın/Alış': has, 'Has Altın/Satış': has + 5,
+        'Cumhuriyet Altın/Alış': cumhuriyet, 'Cumhuriyet Altın/Satış': cumhuriyet + 30,
+        'Canlı Gram Altın/Satış': gram,
+    })
+    ticks_data = [
+        ({'Has Altın': {'Alış': a, 'Satış': s}, 'Cumhuriyet Altın': {'Alış': ca, 'Satış': cs}}, g)
+        for a, s, ca, cs, g in frame.itertuples(index=False)
+    ]
+
+    def run_legacy():
+        return [legacy_derive_gold_prices(gold_data, g) for gold_data, g in ticks_data]
+
+    legacy_time, legacy_result = time_call(run_legacy, repeat=2)
+    engine_time, outputs = time_call(engine.evaluate_frame, frame, repeat=5)
+
+    for i in (0, ticks // 2, ticks - 1):
+        current = engine.to_products(outputs.iloc[i].to_numpy())
+        if any(abs(current[p][side] - legacy_result[i][p][side]) > 1e-9
+               for p in legacy_result[i] for side in ('Alış', 'Satış')):
+            print(f"Result mismatch at tick {i}:\n  legacy:  {legacy_result[i]}\n  current: {current}")
+            sys.exit(1)
+
+    print(f"\n{'ticks':>12} {'legacy (ms)':>12} {'engine (ms)':>12} {'speedup':>8}")
+    print(f"{ticks:>12,} {legacy_time * 1000:>12.1f} {engine_time * 1000:>12.1f} {legacy_time / engine_time:>7.1f}x")
+
+    # Incremental: only the Cumhuriyet inputs move, so only its two targets are recomputed
+    vector = engine.input_vector(frame.iloc[0].to_dict())
+    engine.update(vector)
+    vector[engine.inputs.index('Cumhuriyet Altın/Alış')] += 1
+    engine.update(vector)
+    print(f"Incremental update after a Cumhuriyet change recomputed {engine.last_recomputed} of {len(engine.outputs)} targets")
+
+
+def legacy_extract_numbers_from_text(text):
+    """
+    Baseline: extract_numbers_from_text before the locale-aware tokenizer
+    """
+    number_pattern = r'-?\d+\.?\d*'
+    numbers = re.findall(number_pattern, text)
+
+    numerical_values = []
+    for num in numbers:
+        try:
+            val = float(num)
+            numerical_values.append(val)
+        except ValueError:
+            continue
+
+    return numerical_values
+
+
+def repeat_text(text, target_bytes):
+    return (text * (target_bytes // len(text) + 1))[:target_bytes]
+
+
+def bench_number_tokenizer(sizes=(1_000_000, 4_000_000, 16_000_000)):
+    """
+    Compare numeric.parse_numbers with the baseline regex + float() loop on
+    multi-megabyte text. Both must find the same numbers in text without
+    thousands separators.
+    """
+    base = load_fixture('kapali_carsi.html')
+    texts = {
+        # Prose with prices and percentages between the words
+        'page text': page_text(make_large_page(base, 1_000_000)),
+        # Table cells glued together by get_text(): almost all digits
+        'table text': page_text(base),
+        # Turkish formatted prices, which the baseline splits into wrong numbers
+        'tr_TR prose': "Gram altın bugün 4.286,52 TL'den işlem gördü (%1,25 artış); çeyrek 7.050,00 TL. ",
+    }
+    print(f"\n{'text':<12} {'size':>12} {'legacy (ms)':>12} {'current (ms)':>13} {'MB/s':>7} {'speedup':>8} {'numbers':>17}")
+
+    for kind, sample in texts.items():
+        locale = 'tr_TR' if kind.startswith('tr_TR') else 'en_US'
+        for size in sizes:
+            text = repeat_text(sample, size)
+            repeat = 3 if size < 10_000_000 else 1
+            legacy_time, legacy_result = time_call(legacy_extract_numbers_from_text, text, repeat=repeat)
+            current_time, current_result = time_call(numeric.parse_numbers, text, locale, repeat=repeat)
+
+            if locale == 'en_US' and not np.array_equal(current_result, np.asarray(legacy_result)):
+                print(f"Result mismatch on {kind} at {size:,} bytes")
+                sys.exit(1)
+
+            counts = f"{len(legacy_result):,}/{current_result.size:,}"
+            print(f"{kind:<12} {size:>12,} {legacy_time * 1000:>12.1f} {current_time * 1000:>13.1f} "
+                  f"{size / current_time / 1_000_000:>7.1f} {legacy_time / current_time:>7.1f}x {counts:>17}")
+
+
+def bench_online_stats(size=10_000_000, chunk=100_000, workers=8):
+    """
+    OnlineStats fed chunk by chunk and merged across simulated workers, against
+    exact NumPy statistics over the whole array
+    """
+    rng = np.random.default_rng(0)
+    datasets = {
+        'lognormal prices': rng.lognormal(8, 1.5, size),
+        'signed normal': rng.normal(0, 1_000, size),
+    }
+    print(f"\n{'data':<18} {'exact (ms)':>11} {'online (ms)':>12} {'mean err':>10} {'std err':>10} "
+          f"{'p50 err':>8} {'p95 err':>8} {'p99 err':>8} {'buckets':>8}")
+
+    for kind, values in datasets.items():
+        def exact():
+            return (values.sum(), values.mean(), values.std(ddof=1), values.min(), values.max(),
+                    np.quantile(values, (0.5, 0.95, 0.99), method='lower'))
+
+        def online():
+            partials = [OnlineStats() for _ in range(workers)]
+            for index, start in enumerate(range(0, size, chunk)):
+                partials[index % workers].update(values[start:start + chunk])
+            merged = OnlineStats()
+            for partial in partials:
+                merged.merge(partial)
+            return merged
+
+        exact_time, (_, mean, std, _, _, quantiles) = time_call(exact, repeat=3)
+        online_time, stats = time_call(online, repeat=3)
+        errors = [abs(stats.quantile(q) - value) / abs(value) for q, value in zip((0.5, 0.95, 0.99), quantiles)]
+        buckets = len(stats.sketch.positive) + len(stats.sketch.negative)
+        print(f"{kind:<18} {exact_time * 1000:>11.1f} {online_time * 1000:>12.1f} "
+              f"{abs(stats.mean - mean) / abs(mean):>10.1e} {abs(stats.std - std) / std:>10.1e} "
+              + ' '.join(f"{error:>8.2%}" for error in errors) + f" {buckets:>8}")
+        if max(errors) > stats.sketch.relative_accuracy:
+            print(f"Quantile error above {stats.sketch.relative_accuracy:.0%} on {kind}")
+            sys.exit(1)
+
+
+SUITE_SIZES = (1_000, 100_000, 1_000_000, 10_000_000, 50_000_000)
+
+
+def parse_size(value):
+    """
+    "50MB" / "100KB" / "1000" -> bytes
+    """
+    units = {'KB': 1_000, 'MB': 1_000_000, 'GB': 1_000_000_000}
+    value = value.strip().upper()
+    for unit, factor in units.items():
+        if value.endswith(unit):
+            return int(float(value[:-len(unit)]) * factor)
+    return int(value)
+
+
+def suite_pages(max_size):
+    """
+    (name, html bytes) for every saved snapshot in fixtures/ plus synthetic
+    pages from 1 KB up to `max_size`
+    """
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        if name.endswith('.html'):
+            yield name, load_fixture(name)
+
+    base = load_fixture('kapali_carsi.html')
+    for size in SUITE_SIZES:
+        if size <= max_size:
+            yield f"synthetic_{size}", make_large_page(base, size)
+
+
+def render_gold_cards(gold_data):
+    """
+    Derive every product from the parsed prices and build the card grid main() sends
+    """
+    app.render_gold_card_grid.cache_clear()
+    prices = app.derive_gold_prices(gold_data, 0)
+    return app.render_gold_card_grid(app.gold_panel_rows(prices))
+
+
+def page_text(html):
+    """
+    Full page text the way scrape_website_data() builds it
+    """
+    return BeautifulSoup(html, 'html.parser').get_text()
+
+
+def scrape_full(html):
+    """
+    Numbers of a page the way scrape_website_data() extracts them by default
+    """
+    return app.extract_numbers_from_text(page_text(html))
+
+
+def scrape_bounded(html):
+    """
+    Numbers of a page the way the memory-bounded mode extracts them
+    """
+    numbers, _, _ = app.extract_page_numbers(html, max_numbers=sys.maxsize)
+    return numbers
+
+
+def current_rss():
+    """
+    Resident set size of this process in bytes (Linux /proc)
+    """
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def reset_peak_rss():
+    """
+    Reset the kernel's peak RSS mark (VmHWM) so it covers only what follows
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss():
+    """
+    Peak resident set size of this process in bytes
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _rss_child(func, arg, conn):
+    gc.collect()
+    reset_peak_rss()
+    try:
+        base = current_rss()
+    except OSError:
+        base = peak_rss()
+    result = func(arg)
+    peak = peak_rss() - base
+
+    # Freed memory rarely goes back to the OS, so what a call leaves behind
+    # (its result plus garbage not yet collected) is traced separately
+    del result
+    gc.collect()
+    tracemalloc.start()
+    result = func(arg)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    conn.send((max(0, peak), retained))
+    conn.close()
+
+
+def measure_rss(func, arg):
+    """
+    (peak RSS growth during func(arg), bytes still allocated after it returns)
+    measured in a fresh interpreter so memory freed by earlier stages does not
+    hide it. Unlike tracemalloc the peak includes memory allocated outside
+    Python (lxml trees, NumPy buffers). (None, None) without RSS accounting.
+    """
+    if resource is None:
+        return None, None
+    context = multiprocessing.get_context('spawn')
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_rss_child, args=(func, arg, sender))
+    process.start()
+    sender.close()
+    try:
+        return receiver.recv()
+    except EOFError:
+        return None, None
+    finally:
+        process.join()
+
+
+def measure_stage(func, arg, min_iterations=3, max_iterations=50, time_budget=2.0):
+    """
+    Time func(arg) repeatedly and measure its peak traced memory once.
+    Returns (timings in seconds, peak bytes, last result).
+    """
+    timings = []
+    result = None
+    started = time.perf_counter()
+    while len(timings) < max_iterations:
+        start = time.perf_counter()
+        result = func(arg)
+        timings.append(time.perf_counter() - start)
+        if len(timings) >= min_iterations and time.perf_counter() - started > time_budget:
+            break
+
+    tracemalloc.start()
+    func(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return timings, peak, result
+
+
+def stage_record(page, page_bytes, stage, timings, peak, input_bytes=None, items=None, rss=(None, None)):
+    """
+    One machine-readable result row
+    """
+    timings = np.asarray(timings)
+    p50 = float(np.percentile(timings, 50))
+    record = {
+        'page': page,
+        'page_bytes': page_bytes,
+        'stage': stage,
+        'iterations': int(timings.size),
+        'p50_ms': p50 * 1000,
+        'p99_ms': float(np.percentile(timings, 99)) * 1000,
+        'mean_ms': float(timings.mean()) * 1000,
+        'peak_memory_bytes': int(peak),
+        'peak_rss_bytes': rss[0],
+        'retained_bytes': rss[1],
+        'throughput_mb_s': None,
+        'items_per_s': None,
+    }
+    if input_bytes is not None and p50 > 0:
+        record['throughput_mb_s'] = input_bytes / p50 / 1_000_000
+    if items is not None and p50 > 0:
+        record['items_per_s'] = items / p50
+    return record
+
+
+def run_suite(max_size=SUITE_SIZES[-1], multiplier=1.5, operation='multiply'):
+    """
+    Replay every page through each pipeline stage and collect per-stage results
+    """
+    records = []
+    print(f"{'page':<28} {'stage':<22} {'p50 ms':>10} {'p99 ms':>10} {'MB/s':>8} {'peak MB':>9} {'RSS MB':>8} {'kept MB':>8}")
+
+    for name, html in suite_pages(max_size):
+        first = len(records)
+        text = page_text(html)
+        text_bytes = len(text.encode('utf-8'))
+
+        timings, peak, gold_data = measure_stage(app.parse_kapalicarsi_gold_prices, html)
+        records.append(stage_record(name, len(html), 'parse_kapalicarsi', timings, peak, input_bytes=len(html),
+                                    rss=measure_rss(app.parse_kapalicarsi_gold_prices, html)))
+
+        timings, peak, _ = measure_stage(page_text, html)
+        records.append(stage_record(name, len(html), 'page_text', timings, peak, input_bytes=len(html)))
+
+        timings, peak, numbers = measure_stage(app.extract_numbers_from_text, text)
+        records.append(stage_record(name, len(html), 'extract_numbers', timings, peak, input_bytes=text_bytes, items=len(numbers)))
+
+        # Whole scrape after the download: default path vs. memory-bounded mode
+        timings, peak, _ = measure_stage(scrape_full, html)
+        records.append(stage_record(name, len(html), 'scrape_full', timings, peak, input_bytes=len(html),
+                                    items=len(numbers), rss=measure_rss(scrape_full, html)))
+
+        timings, peak, _ = measure_stage(scrape_bounded, html)
+        records.append(stage_record(name, len(html), 'scrape_bounded', timings, peak, input_bytes=len(html),
+                                    items=len(numbers), rss=measure_rss(scrape_bounded, html)))
+
+        timings, peak, _ = measure_stage(lambda values: app.calculate_results_frame(values, multiplier, operation), numbers)
+        records.append(stage_record(name, len(html), 'calculate_results', timings, peak, items=len(numbers)))
+
+        timings, peak, cards = measure_stage(render_gold_cards, gold_data)
+        records.append(stage_record(name, len(html), 'render_cards', timings, peak, input_bytes=len(cards)))
+
+        for record in records[first:]:
+            throughput = f"{record['throughput_mb_s']:.1f}" if record['throughput_mb_s'] is not None else '-'
+            rss, kept = (f"{value / 1_000_000:.1f}" if value is not None else '-'
+                         for value in (record['peak_rss_bytes'], record['retained_bytes']))
+            print(f"{name:<28} {record['stage']:<22} {record['p50_ms']:>10.2f} {record['p99_ms']:>10.2f} "
+                  f"{throughput:>8} {record['peak_memory_bytes'] / 1_000_000:>9.1f} {rss:>8} {kept:>8}")
+
+    return records
+
+
+def compare_with_baseline(records, baseline_path, tolerance):
+    """
+    Print stages whose p50 got slower than the baseline by more than `tolerance`.
+    Returns the number of regressions.
+    """
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(r['page'], r['stage']): r for r in json.load(f)['results']}
+
+    regressions = 0
+    for record in records:
+        previous = baseline.get((record['page'], record['stage']))
+        if previous and previous['p50_ms'] > 0 and record['p50_ms'] > previous['p50_ms'] * (1 + tolerance):
+            regressions += 1
+            print(f"REGRESSION {record['page']} {record['stage']}: "
+                  f"{previous['p50_ms']:.2f} ms -> {record['p50_ms']:.2f} ms")
+    return regressions
+
+
+BENCHMARK_COMMANDS = ('parser', 'scaling', 'pricing', 'tokenizer', 'stats', 'suite')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline scraper benchmarks")
+    # Checked below rather than with choices=: on Python 3.11 argparse checks the
+    # empty (or default) list itself against choices, so a bare run fails
+    parser.add_argument('commands', nargs='*',
+                        help=f"benchmarks to run: {', '.join(BENCHMARK_COMMANDS)} (default: parser scaling)")
+    parser.add_argument('--max-size', default='50MB', help="largest synthetic page for the suite (e.g. 10MB)")
+    parser.add_argument('--output', default='benchmark_results.json', help="where the suite writes its results")
+    parser.add_argument('--baseline', help="previous results file to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed p50 slowdown vs. baseline")
+    args = parser.parse_args()
+    commands = args.commands or ['parser', 'scaling']
+    unknown = [command for command in commands if command not in BENCHMARK_COMMANDS]
+    if unknown:
+        parser.error(f"invalid choice: {', '.join(unknown)} (choose from {', '.join(BENCHMARK_COMMANDS)})")
+
+    if 'parser' in commands:
+        bench_kapalicarsi_parser()
+    if 'scaling' in commands:
+        bench_page_text_scaling()
+    if 'pricing' in commands:
+        bench_pricing_engine()
+    if 'tokenizer' in commands:
+        bench_number_tokenizer()
+    if 'stats' in commands:
+        bench_online_stats()
+    if 'suite' in commands:
+        records = run_suite(parse_size(args.max_size))
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'results': records,
+            }, f, indent=2)
+        print(f"\nWrote {len(records)} results to {args.output}")
+
+        if args.baseline and compare_with_baseline(records, args.baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+On-demand exports of a results DataFrame.
+
+    payload = export_bytes(df, 'parquet')
+    for chunk in iter_export_chunks(df, 'csv'):
+        ...
+
+Nothing is encoded until an export is asked for, and every format is written
+`chunk_rows` rows at a time, so no format builds its own intermediate string of
+the whole frame. export_bytes still joins the chunks into one bytes object,
+because st.download_button takes the whole payload at once (a file handle is
+read into memory just the same); iter_export_chunks is the way to write a large
+export to disk without that copy. Parquet and Arrow IPC need pyarrow; without it
+only CSV and JSON are offered.
+"""
+import io
+import os
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # columnar exports are optional
+    pyarrow = None
+
+EXPORT_CHUNK_ROWS = int(os.environ.get('EXPORT_CHUNK_ROWS', '50000'))
+
+# format -> (label, MIME type, file extension)
+EXPORT_FORMATS = {
+    'csv': ('CSV', 'text/csv', 'csv'),
+    'json': ('JSON', 'application/json', 'json'),
+    'parquet': ('Parquet', 'application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('Arrow IPC', 'application/vnd.apache.arrow.file', 'arrow'),
+}
+
+COLUMNAR_FORMATS = ('parquet', 'arrow')
+
+
+def available_formats():
+    """
+    Formats that can be exported here, in display order
+    """
+    return [fmt for fmt in EXPORT_FORMATS if pyarrow is not None or fmt not in COLUMNAR_FORMATS]
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only file that hands out what was written since the last take().
+    Keeps its own position so pyarrow's offsets stay correct.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _slices(df, chunk_rows):
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def _iter_columnar(df, fmt, chunk_rows):
+    sink = _ChunkSink()
+    schema = pyarrow.Schema.from_pandas(df, preserve_index=False)
+    if fmt == 'parquet':
+        writer = pyarrow.parquet.ParquetWriter(sink, schema, compression='zstd')
+    else:
+        writer = pyarrow.ipc.new_file(sink, schema)
+    with writer:
+        for chunk in _slices(df, chunk_rows):
+            # One row group / record batch per chunk
+            writer.write_table(pyarrow.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            data = sink.take()
+            if data:
+                yield data
+    yield sink.take()
+
+
+def iter_export_chunks(df, fmt, chunk_rows=None):
+    """
+    Encode `df` as `fmt` and yield the output in pieces of about `chunk_rows` rows.
+    CSV and JSON match df.to_csv(index=False) and df.to_json(orient='records', indent=2).
+    """
+    chunk_rows = chunk_rows or EXPORT_CHUNK_ROWS
+    if fmt not in available_formats():
+        raise ValueError(f"Export format {fmt!r} is not available")
+
+    if fmt == 'csv':
+        yield df.iloc[:0].to_csv(index=False).encode('utf-8')
+        for chunk in _slices(df, chunk_rows):
+            yield chunk.to_csv(index=False, header=False).encode('utf-8')
+    elif fmt == 'json':
+        if df.empty:
+            yield df.to_json(orient='records', indent=2).encode('utf-8')
+            return
+        yield b'['
+        for start, chunk in zip(range(0, len(df), chunk_rows), _slices(df, chunk_rows)):
+            # Each slice encodes as "[\n  {...},\n  {...}\n]"; keep what is between the brackets
+            records = chunk.to_json(orient='records', indent=2)[1:-2]
+            yield (',' + records if start else records).encode('utf-8')
+        yield b'\n]'
+    else:
+        yield from _iter_columnar(df, fmt, chunk_rows)
+
+
+def export_bytes(df, fmt, chunk_rows=None):
+    """
+    The whole export as one bytes object, built chunk by chunk. The full file
+    is held in memory; that is what st.download_button needs. Use
+    iter_export_chunks to write to a file instead.
+    """
+    return b''.join(iter_export_chunks(df, fmt, chunk_rows))
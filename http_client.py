@@ -0,0 +1,281 @@
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+
+from metrics import counter, histogram
+
+# Browser-like headers shared by every scraper
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    # Only advertise the encodings urllib3 can actually decode here (gzip, deflate, br/zstd if installed)
+    'Accept-Encoding': make_headers(accept_encoding=True)['accept-encoding'],
+}
+
+HTTP_REQUEST_SECONDS = histogram('http_request_seconds', "Upstream HTTP request time (until headers for streamed responses)", ['host'])
+HTTP_RESPONSES = counter('http_responses_total', "Upstream HTTP responses by status code (0 = connection error)", ['host', 'status'])
+HTTP_FETCH_BYTES = counter('http_fetch_bytes_total', "Response body bytes received from upstream", ['host'])
+PARSE_RESULTS = counter(
+    'parse_results_total',
+    "fetch_parsed outcomes: parsed, or reused because the page was not modified (304) or its fingerprint matched",
+    ['host', 'result']
+)
+
+
+def read_capped(response, max_bytes, chunk_size=64 * 1024):
+    """
+    Body of a streamed response, read in chunks and cut at `max_bytes`.
+    Returns (body, truncated); the bytes read are counted in HTTP_FETCH_BYTES.
+    """
+    host = urlparse(response.url).hostname or ''
+    chunks = []
+    bytes_read = 0
+    # A declared length over the cap is only read up to the cap
+    declared = response.headers.get('Content-Length', '')
+    truncated = declared.isdigit() and int(declared) > max_bytes
+
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        if bytes_read + len(chunk) > max_bytes:
+            chunk = chunk[:max_bytes - bytes_read]
+            truncated = True
+        bytes_read += len(chunk)
+        HTTP_FETCH_BYTES.inc(len(chunk), host=host)
+        chunks.append(chunk)
+        if bytes_read >= max_bytes:
+            break
+
+    body = b''.join(chunks)
+    return body, truncated
+
+
+class CachedPage:
+    """
+    Last response seen for a URL, with its validators and parsed results
+    """
+
+    def __init__(self, content, etag=None, last_modified=None):
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+        self.parsed = {}
+
+
+class FetchResult:
+    """
+    Body of a conditional GET. `not_modified` is True when the server answered 304
+    and `content` came from the local copy; `truncated` when the body was cut at
+    the size limit.
+    """
+
+    def __init__(self, url, content, status_code, not_modified, page, truncated=False):
+        self.url = url
+        self.content = content
+        self.status_code = status_code
+        self.not_modified = not_modified
+        self.page = page
+        self.truncated = truncated
+
+
+class HttpClient:
+    """
+    Shared HTTP client with keep-alive connection pooling and ETag /
+    If-Modified-Since revalidation.
+
+    A single requests.Session is shared between threads; it is only used for
+    stateless GETs and urllib3's pool manager is thread-safe. The validator
+    cache is guarded by its own lock.
+
+    The cache is an LRU bounded both by page count and by the bytes of the
+    bodies it keeps (`max_cached_bytes`). A body larger than a quarter of the
+    byte budget is not kept, so one big page cannot push out all the others.
+    Released bodies (content=None) only cost their validators.
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=20, max_cached_pages=128, headers=None,
+                 max_cached_bytes=32 * 1024 * 1024):
+        self.session = requests.Session()
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.max_cached_pages = max_cached_pages
+        self.max_cached_bytes = max_cached_bytes
+        self._pages = OrderedDict()
+        # (url, parse key) -> (fingerprint, parsed) of the last parsed body
+        self._fingerprints = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url, timeout=10, **kwargs):
+        """
+        Plain pooled GET. With stream=True the caller counts the bytes it reads
+        in HTTP_FETCH_BYTES.
+        """
+        host = urlparse(url).hostname or ''
+        start = time.perf_counter()
+        try:
+            response = self.session.get(url, timeout=timeout, **kwargs)
+        except requests.RequestException:
+            HTTP_RESPONSES.inc(host=host, status='0')
+            raise
+        finally:
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, host=host)
+
+        HTTP_RESPONSES.inc(host=host, status=str(response.status_code))
+        if not kwargs.get('stream'):
+            HTTP_FETCH_BYTES.inc(len(response.content), host=host)
+        return response
+
+    def fetch(self, url, timeout=10, need_content=True, max_bytes=None):
+        """
+        Conditional GET: revalidates the cached copy of `url` and reuses it on 304.
+        A cached page whose body was released is only revalidated with
+        need_content=False; its 304 result then has no content.
+        With `max_bytes` the body is streamed and cut at that size; a cut body
+        is not cached.
+        """
+        with self._lock:
+            page = self._pages.get(url)
+        if page is not None and page.content is None and need_content:
+            page = None
+
+        headers = {}
+        if page is not None:
+            if page.etag:
+                headers['If-None-Match'] = page.etag
+            if page.last_modified:
+                headers['If-Modified-Since'] = page.last_modified
+
+        stream = max_bytes is not None
+        with self.get(url, headers=headers, timeout=timeout, stream=stream) as response:
+            if response.status_code == 304 and page is not None:
+                with self._lock:
+                    if url in self._pages:
+                        self._pages.move_to_end(url)
+                return FetchResult(url, page.content, 304, True, page)
+
+            response.raise_for_status()
+            truncated = False
+            if stream:
+                content, truncated = read_capped(response, max_bytes)
+            else:
+                content = response.content
+
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        new_page = CachedPage(content, etag, last_modified)
+
+        if (etag or last_modified) and not truncated:
+            with self._lock:
+                if len(new_page.content) <= self.max_cached_bytes // 4:
+                    self._pages[url] = new_page
+                    self._pages.move_to_end(url)
+                else:
+                    self._pages.pop(url, None)
+                self._evict()
+
+        return FetchResult(url, new_page.content, response.status_code, False, new_page, truncated)
+
+    def cached_bytes(self):
+        """
+        Bytes of response bodies currently kept in the validator cache
+        """
+        with self._lock:
+            return self._cached_bytes()
+
+    def _cached_bytes(self):
+        # Summed on demand: bodies can be released (content=None) after caching
+        return sum(len(page.content) for page in self._pages.values() if page.content is not None)
+
+    def _evict(self):
+        # Called with the lock held; oldest pages go first
+        while len(self._pages) > self.max_cached_pages:
+            self._pages.popitem(last=False)
+        cached = self._cached_bytes()
+        while cached > self.max_cached_bytes:
+            _, page = self._pages.popitem(last=False)
+            if page.content is not None:
+                cached -= len(page.content)
+
+    def fetch_parsed(self, url, parse, key=None, timeout=10, fingerprint=None, keep_content=True, max_bytes=None):
+        """
+        Fetch `url` and return `parse(content)`. When the page has not changed
+        since the last call, the previously parsed result is returned without
+        parsing again.
+
+        With `fingerprint(content, whole_page)` a full response whose
+        fingerprint matches the last parsed one (e.g. the same price table with
+        a different banner) is not parsed again either. `parse` then returns
+        (parsed, whole_page): whether the result depended on the whole page
+        rather than the fingerprinted part. That flag is kept with the cached
+        fingerprint and decides what the next response is compared on.
+
+        With keep_content=False the cached body is released once it is parsed;
+        only the validators and parsed result stay in memory. `max_bytes` caps
+        the body read (see fetch).
+        """
+        key = key or getattr(parse, '__name__', repr(parse))
+        host = urlparse(url).hostname or ''
+        result = self.fetch(url, timeout=timeout, need_content=False, max_bytes=max_bytes)
+
+        with self._lock:
+            reused = result.page.parsed.get(key) if result.not_modified else None
+        if reused is not None:
+            PARSE_RESULTS.inc(host=host, result='not_modified')
+            return reused
+        if result.content is None:
+            # Not modified, but parsed under another key after the body was released
+            result = self.fetch(url, timeout=timeout, max_bytes=max_bytes)
+
+        digest = previous = None
+        if fingerprint is not None:
+            with self._lock:
+                previous = self._fingerprints.get((url, key))
+            scope = previous[2] if previous is not None else False
+            digest = fingerprint(result.content, scope)
+            if previous is not None and previous[0] == digest:
+                PARSE_RESULTS.inc(host=host, result='fingerprint')
+                self._store_parsed(result.page, key, previous[1], keep_content)
+                return previous[1]
+
+        parsed = parse(result.content)
+        PARSE_RESULTS.inc(host=host, result='parsed')
+        if fingerprint is not None:
+            parsed, whole_page = parsed
+            if whole_page != scope:
+                digest = fingerprint(result.content, whole_page)
+        self._store_parsed(result.page, key, parsed, keep_content)
+
+        if digest is not None:
+            with self._lock:
+                self._fingerprints[(url, key)] = (digest, parsed, whole_page)
+                self._fingerprints.move_to_end((url, key))
+                while len(self._fingerprints) > self.max_cached_pages:
+                    self._fingerprints.popitem(last=False)
+        return parsed
+
+    def _store_parsed(self, page, key, parsed, keep_content):
+        with self._lock:
+            page.parsed[key] = parsed
+            if not keep_content:
+                page.content = None
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """
+    Process-wide HttpClient shared by all scrapers
+    """
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
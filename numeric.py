@@ -0,0 +1,181 @@
+"""
+Locale-aware extraction of the numbers in a text.
+
+    parse_numbers("Gram 4.286,52 TL (%1,25)", 'tr_TR')   ->  array([4286.52, 1.25])
+    parse_numbers("Gold 1,234.50 (+0.4%)", 'en_US')      ->  array([1234.5, 0.4])
+
+A number is an optional sign (+, -, U+2212) or a percent sign, digits with
+optional thousands groups and decimals in the locale's format, and an
+optional trailing percent sign. Invalid grouping is not guessed at:
+"12345,678" in en_US is the two numbers 12345 and 678.
+
+The text is scanned once. Every character that cannot be part of a number is
+mapped to a space with a byte translate table. Runs that are already one
+plain number are recognised with vectorized NumPy checks; only irregular runs
+go through the token regex. All tokens are then converted to float64 in one
+NumPy call instead of one float() per match. Only ASCII digits are read.
+"""
+import re
+
+import numpy as np
+
+# locale -> (thousands separator, decimal separator)
+LOCALES = {
+    'en_US': (',', '.'),
+    'tr_TR': ('.', ','),
+}
+
+DEFAULT_LOCALE = 'en_US'
+
+# Bytes that can be part of a number; everything else becomes a space
+_NUMBER_BYTES = b'0123456789.,+-%'
+_TRANSLATE_TABLE = bytes(byte if byte in _NUMBER_BYTES else 0x20 for byte in range(256))
+
+# Leading bytes of the number characters used to pick the tokenizing strategy
+_SAMPLE_BYTES = 64 * 1024
+
+
+def _token_pattern(group, decimal):
+    group, decimal = re.escape(group.encode()), re.escape(decimal.encode())
+    # Possessive quantifiers: a token never needs to give digits back. The
+    # lookbehind only lets a thousands group follow 1-3 leading digits.
+    return re.compile(
+        rb'[-+%]?+\d++'
+        rb'(?:(?<!\d\d\d\d)' + group + rb'\d\d\d(?!\d))*+'
+        rb'(?:' + decimal + rb'\d++)?+%?'
+    )
+
+
+_TOKEN_PATTERNS = {name: _token_pattern(group, decimal) for name, (group, decimal) in LOCALES.items()}
+
+
+def _check_locale(locale):
+    if locale not in LOCALES:
+        raise ValueError(f"Unsupported number locale {locale!r}; expected one of {sorted(LOCALES)}")
+
+
+def _compact(text):
+    """
+    The runs of number characters in `text`, separated by single spaces
+    """
+    data = text.replace('−', '-').encode('utf-8').translate(_TRANSLATE_TABLE)
+    # Keep only the first space of every gap; bytes.split() + join would build one object per run
+    chars = np.frombuffer(data, dtype=np.uint8)
+    space = chars == 0x20
+    keep = ~space
+    keep[1:] |= ~space[:-1]
+    return chars[keep].tobytes().strip()
+
+
+def _scan(chars, group, decimal):
+    """
+    Vectorized checks over the number characters (modified in place).
+    Returns (spaces, irregular flag of every run).
+    """
+    digit = (chars >= 0x30) & (chars <= 0x39)
+    prev_digit = np.concatenate(([False], digit[:-1]))
+    next_digit = np.concatenate((digit[1:], [False]))
+    is_separator = (chars == group) | (chars == decimal)
+    is_sign = (chars == 0x2B) | (chars == 0x2D)
+    is_percent = chars == 0x25
+
+    # Punctuation that can never be inside a number ("78.90, next", "- 5",
+    # "%)") becomes a space, so it no longer makes its run irregular
+    chars[
+        (is_separator & ~(prev_digit & next_digit))
+        | (is_sign & ~next_digit)
+        | (is_percent & ~(prev_digit | next_digit))
+    ] = 0x20
+    space = chars == 0x20
+    run_start = np.concatenate(([True], space[:-1]))
+    run_end = np.concatenate((space[1:], [True]))
+
+    irregular = (
+        (is_sign & ~run_start)
+        | (is_percent & ~((run_start & next_digit) | (run_end & prev_digit)))
+        | (chars == group)
+    )
+    run_ids = np.cumsum(space)
+    runs = int(run_ids[-1]) + 1
+    irregular_runs = np.zeros(runs, dtype=bool)
+    irregular_runs[run_ids[irregular]] = True
+    # More than one decimal separator, e.g. table cells glued together
+    irregular_runs |= np.bincount(run_ids[chars == decimal], minlength=runs) > 1
+    return space, irregular_runs
+
+
+def _token_bytes(text, locale):
+    """
+    The number tokens of `text`, separated by spaces.
+
+    Most runs of number characters already are one plain number ("4286.52",
+    "-3", "12%"). Those are found with vectorized checks over the bytes and
+    kept as they are; only the other runs (grouped numbers, dates, stray
+    signs) go through the token regex. When many runs are irregular (table
+    cells glued together by get_text(), grouped numbers) one regex pass over
+    everything is cheaper than slicing out each run.
+    """
+    _check_locale(locale)
+    compact = _compact(text)
+    if not compact:
+        return compact
+    group, decimal = (ord(separator) for separator in LOCALES[locale])
+    pattern = _TOKEN_PATTERNS[locale]
+
+    # Decide on a sample first so irregular text skips the full scan
+    _, irregular_runs = _scan(np.frombuffer(compact[:_SAMPLE_BYTES], dtype=np.uint8).copy(), group, decimal)
+    if np.count_nonzero(irregular_runs) * 16 > irregular_runs.size:
+        return b' '.join(pattern.findall(compact))
+
+    chars = np.frombuffer(compact, dtype=np.uint8).copy()
+    space, irregular_runs = _scan(chars, group, decimal)
+    if np.count_nonzero(irregular_runs) * 16 > irregular_runs.size:
+        return b' '.join(pattern.findall(compact))
+    compact = chars.tobytes()
+    if not irregular_runs.any():
+        return compact
+
+    separators = np.flatnonzero(space)
+    starts = np.concatenate(([0], separators + 1))
+    ends = np.concatenate((separators, [len(compact)]))
+    pieces = []
+    position = 0
+    for run in np.flatnonzero(irregular_runs).tolist():
+        start, end = int(starts[run]), int(ends[run])
+        pieces.append(compact[position:start])
+        pieces.append(b' '.join(pattern.findall(compact, start, end)))
+        position = end
+    pieces.append(compact[position:])
+    return b''.join(pieces)
+
+
+def _to_array(token_bytes, locale):
+    group, decimal = LOCALES[locale]
+    token_bytes = token_bytes.translate(None, b'%' + group.encode())
+    if decimal != '.':
+        token_bytes = token_bytes.replace(decimal.encode(), b'.')
+    if not token_bytes.strip():
+        return np.empty(0, dtype=np.float64)
+    # One C-level parse of all tokens; no per-number Python objects
+    return np.fromstring(token_bytes, dtype=np.float64, sep=' ')
+
+
+def parse_numbers(text, locale=DEFAULT_LOCALE):
+    """
+    Every number in `text` as a float64 array (percentages at face value: "12%" -> 12.0)
+    """
+    return _to_array(_token_bytes(text, locale), locale)
+
+
+def first_number(text, locale=DEFAULT_LOCALE):
+    """
+    First number in `text` as a float, None if there is none
+    """
+    _check_locale(locale)
+    data = text.replace('−', '-').encode('utf-8').translate(_TRANSLATE_TABLE)
+    match = _TOKEN_PATTERNS[locale].search(data)
+    if match is None:
+        return None
+    group, decimal = LOCALES[locale]
+    token = match.group(0).translate(None, b'%' + group.encode()).replace(decimal.encode(), b'.')
+    return float(token)
@@ -0,0 +1,265 @@
+"""
+Mergeable online statistics for streams of numbers.
+
+    stats = OnlineStats()
+    stats.update(chunk_values)          # as numbers arrive, one array at a time
+    stats.merge(other_worker_stats)     # combine partial results
+    stats.summary()  ->  {'count': ..., 'mean': ..., 'p95': ..., ...}
+
+Mean and variance use Welford's algorithm; batches and merges are combined
+with the pairwise formula of Chan et al., so the result does not depend on how
+the numbers were split. Quantiles come from a DDSketch-style log-bucket sketch:
+every estimate is within `relative_accuracy` (1% by default) of a value of the
+requested rank, using a few hundred buckets instead of the numbers themselves.
+"""
+import math
+
+import numpy as np
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+DEFAULT_MAX_BUCKETS = 2048
+
+# Magnitudes below this are counted as zero
+MIN_INDEXABLE = 1e-9
+
+SUMMARY_QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _add_counts(store, keys):
+    keys, counts = np.unique(keys, return_counts=True)
+    for key, count in zip(keys.tolist(), counts.tolist()):
+        store[key] = store.get(key, 0) + count
+
+
+class QuantileSketch:
+    """
+    Relative-error quantile sketch over finite numbers. Positive and negative
+    magnitudes go into logarithmic buckets of ratio gamma = (1 + a) / (1 - a);
+    each bucket is represented by the point within `a` of all its values.
+    """
+
+    def __init__(self, relative_accuracy=DEFAULT_RELATIVE_ACCURACY, max_buckets=DEFAULT_MAX_BUCKETS):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError(f"relative_accuracy must be between 0 and 1, got {relative_accuracy!r}")
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def _keys(self, magnitudes):
+        return np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64)
+
+    def _value(self, key):
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def _collapse(self, store):
+        # Fold the smallest magnitudes into one bucket; large values keep their accuracy
+        if len(store) <= self.max_buckets:
+            return
+        keys = sorted(store)
+        cut = len(keys) - self.max_buckets
+        store[keys[cut]] += sum(store.pop(key) for key in keys[:cut])
+
+    def add(self, value):
+        self.update(np.array([value], dtype=np.float64))
+
+    def update(self, values):
+        """
+        Add every finite value of the array
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[np.isfinite(values)]
+        if not values.size:
+            return
+        magnitudes = np.abs(values)
+        indexable = magnitudes >= MIN_INDEXABLE
+        self.zero_count += int(values.size - np.count_nonzero(indexable))
+        positive = indexable & (values > 0)
+        negative = indexable & (values < 0)
+        if positive.any():
+            _add_counts(self.positive, self._keys(magnitudes[positive]))
+            self._collapse(self.positive)
+        if negative.any():
+            _add_counts(self.negative, self._keys(magnitudes[negative]))
+            self._collapse(self.negative)
+        self.count += int(values.size)
+
+    def merge(self, other):
+        """
+        Add the counts of `other` (same relative accuracy) to this sketch
+        """
+        if other.gamma != self.gamma:
+            raise ValueError("Only sketches with the same relative accuracy can be merged")
+        for store, other_store in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in other_store.items():
+                store[key] = store.get(key, 0) + count
+            self._collapse(store)
+        self.zero_count += other.zero_count
+        self.count += other.count
+        return self
+
+    def quantile(self, q):
+        """
+        Estimate of the q-quantile (0 <= q <= 1), None when the sketch is empty
+        """
+        if not 0 <= q <= 1:
+            raise ValueError(f"Quantile must be between 0 and 1, got {q!r}")
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+
+        seen = 0
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._value(key)
+        seen += self.zero_count
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self.positive))
+
+
+class OnlineStats:
+    """
+    Count, sum, mean, variance, min/max and quantiles of a stream of numbers.
+    Infinite and NaN values are counted and kept in the sum, min and max, but
+    left out of the variance and the quantile sketch.
+    """
+
+    def __init__(self, relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.nonfinite = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    @classmethod
+    def from_values(cls, values, relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+        stats = cls(relative_accuracy)
+        stats.update(values)
+        return stats
+
+    @property
+    def finite_count(self):
+        return self.count - self.nonfinite
+
+    def _combine(self, count, mean, m2):
+        # Chan et al.: exact mean and sum of squared deviations of the union
+        if not count:
+            return
+        finite = self.finite_count
+        combined = finite + count
+        delta = mean - self._mean
+        self._mean += delta * count / combined
+        self._m2 += m2 + delta * delta * finite * count / combined
+
+    def add(self, value):
+        """
+        Add one number (Welford's update)
+        """
+        value = float(value)
+        self.count += 1
+        self.total += value
+        if math.isnan(value):
+            self.nonfinite += 1
+            return
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if math.isinf(value):
+            self.nonfinite += 1
+            return
+        delta = value - self._mean
+        self._mean += delta / self.finite_count
+        self._m2 += delta * (value - self._mean)
+        self.sketch.add(value)
+
+    def update(self, values):
+        """
+        Add an array of numbers in one vectorized step
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if not values.size:
+            return
+        finite = values[np.isfinite(values)]
+        ordered = values[~np.isnan(values)]
+        if ordered.size:
+            self.min = min(self.min, float(ordered.min()))
+            self.max = max(self.max, float(ordered.max()))
+        self.total += float(values.sum())
+
+        if finite.size:
+            mean = float(finite.mean())
+            m2 = float(np.square(finite - mean).sum())
+            self._combine(finite.size, mean, m2)
+            self.sketch.update(finite)
+        self.count += int(values.size)
+        self.nonfinite += int(values.size - finite.size)
+
+    def merge(self, other):
+        """
+        Add the numbers summarized by `other`, e.g. another worker's stats
+        """
+        self._combine(other.finite_count, other._mean, other._m2)
+        self.count += other.count
+        self.nonfinite += other.nonfinite
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.sketch.merge(other.sketch)
+        return self
+
+    @property
+    def mean(self):
+        if not self.count:
+            return None
+        if self.nonfinite:
+            return self.total / self.count
+        return self._mean
+
+    @property
+    def variance(self):
+        """
+        Sample variance of the finite values, None for fewer than two
+        """
+        if self.finite_count < 2:
+            return None
+        return self._m2 / (self.finite_count - 1)
+
+    @property
+    def std(self):
+        variance = self.variance
+        return None if variance is None else math.sqrt(variance)
+
+    def quantile(self, q):
+        estimate = self.sketch.quantile(q)
+        if estimate is None:
+            return None
+        # The bucket midpoint can lie just outside the observed range
+        return min(max(estimate, self.min), self.max)
+
+    def summary(self, quantiles=SUMMARY_QUANTILES):
+        """
+        Plain dict of the statistics, quantiles as 'p50', 'p95', ...
+        """
+        summary = {
+            'count': self.count,
+            'sum': self.total,
+            'mean': self.mean,
+            'std': self.std,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+        }
+        for q in quantiles:
+            summary[f'p{q * 100:g}'] = self.quantile(q)
+        return summary
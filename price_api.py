@@ -0,0 +1,137 @@
+"""
+Read-only JSON API for the latest computed gold prices.
+
+    GET /prices  ->  {"prices": {"Çeyrek Altın": {"Alış": ..., "Satış": ...}, ...}, "stale": {...}}
+
+The body and its ETag are built once per snapshot and reused for every
+request until the snapshot changes, so a request is a dictionary lookup plus a
+socket write. The snapshot time is not part of the body; it is sent in
+Last-Modified and X-Fetched-At (on 304s too). The body therefore stays
+byte-for-byte the same while the prices are unchanged, and the ETag is a
+strong validator: a hash of the exact body bytes. Pollers that send it back in
+If-None-Match get an empty 304 until the body changes, even though the
+snapshot is refreshed every few seconds.
+"""
+import hashlib
+import json
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def encode_json(value):
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+class PriceApi:
+    """
+    Encoded response for the current snapshot. `get_snapshot` returns the
+    latest snapshot (the same object while it is unchanged) and
+    `build_payload` turns it into a JSON-serialisable dict, or None when there
+    is no usable data yet. The payload should not contain the snapshot time;
+    `fetched_at(snapshot)` (snapshot['fetched_at'] by default) is sent as headers.
+    """
+
+    def __init__(self, get_snapshot, build_payload, max_age=30, fetched_at=None):
+        self.get_snapshot = get_snapshot
+        self.build_payload = build_payload
+        self.max_age = max_age
+        self.fetched_at = fetched_at or (lambda snapshot: snapshot.get('fetched_at'))
+
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._response = None
+
+    def current(self):
+        """
+        (body, etag, freshness headers) for the latest snapshot,
+        (None, None, None) when nothing is available
+        """
+        snapshot = self.get_snapshot()
+        with self._lock:
+            if snapshot is self._snapshot and self._response is not None:
+                return self._response
+
+        payload = self.build_payload(snapshot) if snapshot is not None else None
+        if payload is None:
+            response = (None, None, None)
+        else:
+            body = encode_json(payload)
+            etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+            headers = {}
+            fetched_at = self.fetched_at(snapshot)
+            if fetched_at is not None:
+                headers = {'Last-Modified': formatdate(fetched_at, usegmt=True), 'X-Fetched-At': str(fetched_at)}
+            response = (body, etag, headers)
+
+        with self._lock:
+            self._snapshot = snapshot
+            self._response = response
+        return response
+
+
+def etag_matches(if_none_match, etag):
+    """
+    If-None-Match check (weak comparison: W/"x" and "x" are equal)
+    """
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    etag = etag.removeprefix('W/')
+    return any(tag.strip().removeprefix('W/') == etag for tag in if_none_match.split(','))
+
+
+def make_handler(api):
+    class PriceApiHandler(BaseHTTPRequestHandler):
+        # Keep-alive so pollers reuse their connection
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            self._respond(include_body=True)
+
+        def do_HEAD(self):
+            self._respond(include_body=False)
+
+        def _respond(self, include_body):
+            if self.path.split('?', 1)[0] not in ('/prices', '/prices/'):
+                self._send(404, b'{"error":"not found"}', include_body)
+                return
+
+            body, etag, freshness = api.current()
+            if body is None:
+                self._send(503, b'{"error":"no price data yet"}', include_body, {'Retry-After': '5'})
+                return
+
+            headers = {'ETag': etag, 'Cache-Control': f'public, max-age={int(api.max_age)}', **freshness}
+            if etag_matches(self.headers.get('If-None-Match'), etag):
+                self._send(304, b'', False, headers)
+            else:
+                self._send(200, body, include_body, headers)
+
+        def _send(self, status, body, include_body, headers=None):
+            self.send_response(status)
+            if status != 304:
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            if include_body and body:
+                self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Access logs at thousands of requests per second are just noise
+            pass
+
+    return PriceApiHandler
+
+
+def serve_price_api(api, host='127.0.0.1', port=8600):
+    """
+    Start the API on a daemon thread and return the server (server.shutdown() stops it)
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(api))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='price-api', daemon=True).start()
+    return server
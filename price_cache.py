@@ -0,0 +1,153 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+from singleflight import SingleFlight
+
+
+class SnapshotCache:
+    """
+    Process-wide snapshot cache with stale-while-revalidate refresh.
+
+    The first call loads synchronously. After that the last good snapshot is
+    returned immediately; once it is older than `ttl` seconds a single
+    background thread refreshes it while readers keep getting the old value.
+    """
+
+    def __init__(self, loader, ttl=30, is_good=None):
+        self.loader = loader
+        self.ttl = ttl
+        self.is_good = is_good or (lambda value: True)
+
+        self._lock = threading.Lock()
+        self._value = None
+        self._loaded_at = None
+        self._refreshing = False
+        self._has_good = False
+        self.last_error = None
+        self._flight = SingleFlight('snapshot')
+
+    def age(self):
+        """
+        Seconds since the cached snapshot was loaded, None if nothing is cached
+        """
+        if self._loaded_at is None:
+            return None
+        return time.time() - self._loaded_at
+
+    def get(self):
+        """
+        Return the cached snapshot, loading or refreshing it as needed
+        """
+        with self._lock:
+            value = self._value
+            loaded_at = self._loaded_at
+
+        if loaded_at is None:
+            return self.refresh()
+
+        if time.time() - loaded_at > self.ttl:
+            self._start_background_refresh()
+
+        return value
+
+    def refresh(self):
+        """
+        Load a new snapshot synchronously and return the best value available.
+        Callers arriving while a load is running wait for it instead of starting another.
+        """
+        return self._flight.do('refresh', self._load)
+
+    def _load(self):
+        try:
+            value = self.loader()
+        except Exception as e:
+            value = None
+            self.last_error = str(e)
+
+        with self._lock:
+            if value is not None and self.is_good(value):
+                self._value = value
+                self._loaded_at = time.time()
+                self._has_good = True
+                self.last_error = None
+            elif not self._has_good and value is not None:
+                # No good snapshot yet: hand out the failed one so the caller
+                # can show the error, and retry on the next read
+                self._value = value
+                self._loaded_at = time.time() - self.ttl
+            elif self._loaded_at is not None:
+                # Keep serving the last good snapshot, retry in a few seconds
+                self._loaded_at = time.time() - self.ttl + min(self.ttl, 5)
+            return self._value
+
+    def _start_background_refresh(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name="snapshot-refresh", daemon=True).start()
+
+
+def _file_identity(stat):
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class SnapshotFile:
+    """
+    Snapshot published as a JSON file that is replaced atomically.
+
+    A writer (the ingestion worker) writes to a temp file in the same directory
+    and renames it over the target. Readers only re-read the file when its
+    (inode, mtime, size) changes, so a read is normally one stat() call. The
+    inode catches a replacement written within the filesystem's mtime
+    granularity.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._identity = None
+        self._value = None
+
+    def write(self, snapshot):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.snapshot-', suffix='.json', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def read(self):
+        """
+        Latest published snapshot, None if nothing has been published yet
+        """
+        try:
+            identity = _file_identity(os.stat(self.path))
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            if identity != self._identity:
+                with open(self.path, encoding='utf-8') as f:
+                    # Key on the file actually opened, in case it was replaced after the stat()
+                    identity = _file_identity(os.fstat(f.fileno()))
+                    self._value = json.load(f)
+                self._identity = identity
+            return self._value
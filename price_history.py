@@ -0,0 +1,143 @@
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ticks (
+    product TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    alis REAL,
+    satis REAL,
+    PRIMARY KEY (product, ts)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS ticks_ts ON ticks (ts);
+
+CREATE TABLE IF NOT EXISTS ticks_hourly (
+    product TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    alis REAL,
+    satis REAL,
+    samples INTEGER NOT NULL,
+    PRIMARY KEY (product, ts)
+) WITHOUT ROWID;
+"""
+
+
+class PriceHistory:
+    """
+    Append-only price history in SQLite.
+
+    Ticks are buffered and written in batches. Rows are clustered on
+    (product, ts) with a secondary index on ts, so time-range queries only
+    touch the rows in range.
+    Raw ticks older than `raw_retention` are downsampled to hourly averages,
+    and hourly rows older than `max_retention` are dropped.
+    """
+
+    def __init__(self, path, batch_size=50, flush_interval=60,
+                 raw_retention=7 * 24 * 3600, max_retention=365 * 24 * 3600):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.raw_retention = raw_retention
+        self.max_retention = max_retention
+
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._last_flush = time.time()
+        self._last_compact = 0
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def record(self, prices, ts=None):
+        """
+        Buffer one tick. `prices` maps product -> {'Alış': ..., 'Satış': ...}
+        """
+        ts = int(ts if ts is not None else time.time())
+        with self._lock:
+            for product, price in prices.items():
+                self._buffer.append((product, ts, price.get('Alış'), price.get('Satış')))
+            due = len(self._buffer) >= self.batch_size or time.time() - self._last_flush >= self.flush_interval
+
+        if due:
+            self.flush()
+
+    def flush(self):
+        """
+        Write buffered ticks in a single transaction and compact old data once an hour
+        """
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+            self._last_flush = time.time()
+            if rows:
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO ticks (product, ts, alis, satis) VALUES (?, ?, ?, ?)",
+                        rows
+                    )
+            if time.time() - self._last_compact >= 3600:
+                self._compact()
+                self._last_compact = time.time()
+
+    def _compact(self):
+        now = time.time()
+        cutoff = int(now - self.raw_retention) // 3600 * 3600
+        with self._conn:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO ticks_hourly (product, ts, alis, satis, samples)
+                SELECT product, ts / 3600 * 3600, AVG(alis), AVG(satis), COUNT(*)
+                FROM ticks WHERE ts < ?
+                GROUP BY product, ts / 3600
+                """,
+                (cutoff,)
+            )
+            self._conn.execute("DELETE FROM ticks WHERE ts < ?", (cutoff,))
+            self._conn.execute("DELETE FROM ticks_hourly WHERE ts < ?", (int(now - self.max_retention),))
+
+    def query(self, start=None, end=None, resolution=60, products=None):
+        """
+        Prices between `start` and `end` (epoch seconds) averaged into
+        `resolution`-second buckets. Returns a DataFrame with time (tz-aware
+        UTC), product, Alış and Satış columns. Buffered ticks are flushed first.
+        """
+        self.flush()
+
+        end = int(end if end is not None else time.time())
+        start = int(start if start is not None else end - 24 * 3600)
+        resolution = max(1, int(resolution))
+
+        product_filter = ""
+        products = list(products or [])
+        if products:
+            product_filter = f"AND product IN ({', '.join('?' * len(products))})"
+        params = [resolution, start, end, *products] * 2
+
+        sql = f"""
+            SELECT product, bucket, AVG(alis), AVG(satis) FROM (
+                SELECT product, ts / ? AS bucket, alis, satis FROM ticks
+                WHERE ts BETWEEN ? AND ? {product_filter}
+                UNION ALL
+                SELECT product, ts / ? AS bucket, alis, satis FROM ticks_hourly
+                WHERE ts BETWEEN ? AND ? {product_filter}
+            )
+            GROUP BY product, bucket
+            ORDER BY bucket, product
+        """
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        df = pd.DataFrame(rows, columns=['product', 'bucket', 'Alış', 'Satış'])
+        df.insert(0, 'time', pd.to_datetime(df.pop('bucket') * resolution, unit='s', utc=True))
+        return df
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,267 @@
+"""
+Declarative price source adapters.
+
+Each source in price_sources.json (GOLD_SOURCES_PATH) declares its URL, the
+XPath of its price rows and cells, the number format and an ordered product
+mapping:
+
+    {"name": "kapalicarsi", "label": "Kapalıçarşı", "url": "https://...",
+     "row_xpath": "//tr", "cell_xpath": "./td", "cells": [0, 1, 2], "decimal": ".",
+     "products": [{"product": "Çeyrek Altın", "pattern": "Çeyrek Altın", "exclude": "Eski"}],
+     "required": ["Has Altın"], "fallback": "page_text",
+     "region": ["<table", "</table>"]}
+
+Selectors and patterns are compiled once when the file is loaded. A row
+belongs to the first product whose pattern is found in its name cell (and
+whose `exclude` pattern is not). Products missing from the table can be filled
+by a named fallback parser supplied by the caller.
+
+`region` marks the price table in the raw page (first start marker to last end
+marker). Its hash is the page's fingerprint: a response whose table region is
+unchanged is not parsed again.
+"""
+import hashlib
+import json
+import re
+import statistics
+
+from bs4 import BeautifulSoup, SoupStrainer, UnicodeDammit
+
+from metrics import histogram
+from numeric import first_number
+
+try:
+    import lxml.etree
+    import lxml.html
+except ImportError:  # without lxml rows are read with BeautifulSoup (<tr>/<td> only)
+    lxml = None
+
+SOURCE_PARSE_SECONDS = histogram('source_parse_seconds', "Time spent parsing each source's page", ['source'])
+
+# Number format of each `decimal` setting
+DECIMAL_LOCALES = {'.': 'en_US', ',': 'tr_TR'}
+
+
+def parse_price(cell_text, decimal='.'):
+    """
+    First price in the cell as a float (e.g. "4286.52 0.00% 0.00" -> 4286.52).
+    With decimal=',' the Turkish format ("4.291,77") is read, otherwise the
+    English one ("4,291.77").
+    """
+    price = first_number(cell_text, DECIMAL_LOCALES[decimal])
+    if price is None:
+        raise ValueError(f"No price in {cell_text!r}")
+    return price
+
+
+def release_soup(soup):
+    """
+    Tear a BeautifulSoup tree down now instead of at the next cyclic garbage
+    collection. The BeautifulSoup object is not linked to its first element,
+    so soup.decompose() alone would only clear the root.
+    """
+    for child in list(soup.contents):
+        child.decompose()
+    soup.decompose()
+
+
+def valid_rate(rate):
+    """
+    A usable buy/sell pair: both positive and buy not above sell
+    """
+    alis, satis = rate.get('Alış'), rate.get('Satış')
+    return bool(alis and satis and 0 < alis <= satis)
+
+
+class SourceAdapter:
+    def __init__(self, name, url, products, label=None, row_xpath='//tr', cell_xpath='./td',
+                 cells=(0, 1, 2), decimal='.', required=(), fallback=None, region=('<table', '</table>')):
+        self.name = name
+        self.label = label or name
+        self.url = url
+        self.cells = tuple(cells)
+        if decimal not in DECIMAL_LOCALES:
+            raise ValueError(f"Source {name!r}: decimal must be one of {sorted(DECIMAL_LOCALES)}, got {decimal!r}")
+        self.decimal = decimal
+        self.required = tuple(required)
+        self.fallback = fallback
+        self.region = tuple(marker.encode('utf-8') for marker in region) if region else None
+
+        self.products = []
+        for entry in products:
+            exclude = entry.get('exclude')
+            self.products.append((
+                entry['product'],
+                re.compile(entry['pattern'], re.DOTALL),
+                re.compile(exclude, re.DOTALL) if exclude else None
+            ))
+        self.product_names = list(dict.fromkeys(product for product, _, _ in self.products))
+
+        if lxml is not None:
+            self._row_xpath = lxml.etree.XPath(row_xpath)
+            self._cell_xpath = lxml.etree.XPath(cell_xpath)
+
+    def iter_rows(self, html):
+        """
+        (name, buy, sell) cell texts of every price row, in one pass.
+        Uses lxml with the compiled selectors; without lxml a SoupStrainer
+        parses only the <tr> elements.
+        """
+        needed = max(self.cells) + 1
+        name_cell, alis_cell, satis_cell = self.cells
+
+        if lxml is not None:
+            try:
+                if isinstance(html, bytes):
+                    html = UnicodeDammit(html, is_html=True).unicode_markup
+                root = lxml.html.fromstring(html)
+            except ValueError:
+                root = None
+
+            if root is not None:
+                for row in self._row_xpath(root):
+                    cells = self._cell_xpath(row)
+                    if len(cells) >= needed:
+                        yield (
+                            ''.join(cells[name_cell].itertext()).strip(),
+                            ' '.join(cells[alis_cell].itertext()),
+                            ' '.join(cells[satis_cell].itertext())
+                        )
+                return
+
+        soup = BeautifulSoup(html, 'html.parser', parse_only=SoupStrainer('tr'))
+        try:
+            for row in soup.find_all('tr'):
+                cells = row.find_all('td')
+                if len(cells) >= needed:
+                    yield (
+                        cells[name_cell].get_text(strip=True),
+                        cells[alis_cell].get_text(' ', strip=True),
+                        cells[satis_cell].get_text(' ', strip=True)
+                    )
+        finally:
+            release_soup(soup)
+
+    def match_product(self, name):
+        for product, pattern, exclude in self.products:
+            if pattern.search(name) and not (exclude and exclude.search(name)):
+                return product
+        return None
+
+    def parse(self, html):
+        """
+        {product: {'Alış': ..., 'Satış': ...}} from the page. A later row of the
+        same product replaces an earlier one; products the table lacks come
+        from the fallback.
+        """
+        return self.parse_page(html)[0]
+
+    def parse_page(self, html):
+        """
+        (parse(html), whether the fallback was used, i.e. the result depends on
+        text outside the table region)
+        """
+        with SOURCE_PARSE_SECONDS.time(source=self.name):
+            data = {}
+            for name, alis_text, satis_text in self.iter_rows(html):
+                product = self.match_product(name)
+                if product is None:
+                    continue
+                try:
+                    data[product] = {
+                        'Alış': parse_price(alis_text, self.decimal),
+                        'Satış': parse_price(satis_text, self.decimal)
+                    }
+                except ValueError:
+                    continue
+
+            missing = [product for product in self.product_names if product not in data]
+            used_fallback = bool(missing and self.fallback is not None)
+            if used_fallback:
+                fallback = self.fallback(html)
+                for product in missing:
+                    if product in fallback:
+                        data[product] = fallback[product]
+            return data, used_fallback
+
+    def fingerprint(self, content, whole_page=False):
+        """
+        Hash of the price table region of the raw page. The whole page is
+        hashed when the region is not found or with whole_page=True (the
+        previous parse needed the fallback, i.e. prices outside the table).
+        """
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        region = content
+        if self.region is not None and not whole_page:
+            start = content.find(self.region[0])
+            end = content.rfind(self.region[1])
+            if start != -1 and end > start:
+                region = content[start:end + len(self.region[1])]
+        return hashlib.blake2b(region, digest_size=16).digest()
+
+    def is_good(self, data):
+        return bool(data) and all(product in data for product in self.required)
+
+    def fetch(self, client, timeout=10, max_bytes=None):
+        """
+        Fetch and parse the page, reading at most `max_bytes` of it; an
+        unchanged page (304) or price table region reuses the last parse
+        """
+        return client.fetch_parsed(self.url, self.parse_page, key=f'source:{self.name}', timeout=timeout,
+                                   fingerprint=self.fingerprint, keep_content=False, max_bytes=max_bytes)
+
+
+def load_adapters(path, fallbacks=None):
+    """
+    Compile every source in the file. `fallbacks` maps the names used in
+    "fallback" to parser callables.
+    """
+    fallbacks = fallbacks or {}
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+
+    adapters = []
+    for entry in config:
+        entry = dict(entry)
+        fallback = entry.pop('fallback', None)
+        if fallback is not None:
+            if fallback not in fallbacks:
+                raise ValueError(f"Unknown fallback {fallback!r} for source {entry.get('name')!r}")
+            entry['fallback'] = fallbacks[fallback]
+        adapters.append(SourceAdapter(**entry))
+
+    names = [adapter.name for adapter in adapters]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate source names in {path}: {names}")
+    return adapters
+
+
+def consensus_rate(rates, method='median'):
+    """
+    Combine (source, rate) pairs, in arrival order, into one rate.
+    'median' takes the per-side median of the valid rates, 'first' the first
+    valid one. Returns (rate, sources used); (None, []) if none is valid.
+    """
+    valid = [(name, rate) for name, rate in rates if valid_rate(rate)]
+    if not valid:
+        return None, []
+    if method == 'first':
+        name, rate = valid[0]
+        return {'Alış': rate['Alış'], 'Satış': rate['Satış']}, [name]
+    return {
+        'Alış': statistics.median(rate['Alış'] for _, rate in valid),
+        'Satış': statistics.median(rate['Satış'] for _, rate in valid)
+    }, [name for name, _ in valid]
+
+
+_adapters = {}
+
+
+def get_adapters(path, fallbacks=None):
+    """
+    Adapters for `path`, compiled on first use and shared by the process
+    """
+    if path not in _adapters:
+        _adapters[path] = load_adapters(path, fallbacks)
+    return _adapters[path]
@@ -0,0 +1,235 @@
+"""
+Declarative derived-price engine.
+
+Every derived price is one row of a rule table (pricing_rules.json by default,
+PRICING_RULES_PATH to override):
+
+    {"target": "Yarım Altın/Alış", "from": "Çeyrek Altın/Alış", "op": "multiply", "operand": 2}
+
+Columns are named "<product>/<side>". A rule reads either a raw input column
+("input") or another rule's target ("from"), applies one operation and writes
+its target. The rules form a dependency graph that is compiled into levels;
+each level is evaluated with a handful of NumPy ufunc calls, so the same pass
+works for a single tick or for a whole (ticks x inputs) history array.
+"""
+import json
+import os
+import threading
+from graphlib import TopologicalSorter
+
+import numpy as np
+import pandas as pd
+
+RULES_PATH = os.environ.get(
+    'PRICING_RULES_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pricing_rules.json')
+)
+
+RULE_OPERATIONS = {
+    'copy': None,
+    'add': np.add,
+    'subtract': np.subtract,
+    'multiply': np.multiply,
+    'divide': np.divide,
+}
+
+
+def split_column(column):
+    """
+    "Çeyrek Altın/Alış" -> ("Çeyrek Altın", "Alış")
+    """
+    product, _, side = column.rpartition('/')
+    return product, side
+
+
+class PricingEngine:
+    """
+    Compiled rule table. `evaluate` computes every target from scratch;
+    `update` keeps the last tick and only recomputes the targets downstream
+    of the inputs that changed.
+    """
+
+    def __init__(self, rules):
+        self.rules = [dict(rule) for rule in rules]
+        self.outputs = []
+        self.inputs = []
+
+        for rule in self.rules:
+            target = rule.get('target')
+            if not target or target in self.outputs:
+                raise ValueError(f"Rule target missing or defined twice: {rule}")
+            if ('from' in rule) == ('input' in rule):
+                raise ValueError(f"Rule needs exactly one of 'from' or 'input': {rule}")
+            if rule.get('op', 'copy') not in RULE_OPERATIONS:
+                raise ValueError(f"Unknown rule operation {rule.get('op')!r}: {rule}")
+            self.outputs.append(target)
+            if 'input' in rule and rule['input'] not in self.inputs:
+                self.inputs.append(rule['input'])
+
+        for rule in self.rules:
+            if 'from' in rule and rule['from'] not in self.outputs:
+                raise ValueError(f"Rule depends on an undefined target {rule['from']!r}: {rule}")
+
+        self._input_index = {name: i for i, name in enumerate(self.inputs)}
+        self._output_index = {name: i for i, name in enumerate(self.outputs)}
+        self._compile()
+
+        self._lock = threading.Lock()
+        self._last_inputs = None
+        self._state = None
+        self.last_recomputed = 0
+
+    def _compile(self):
+        """
+        Group the rules into dependency levels and each level into one
+        (targets, sources, operands) batch per operation. Sources index the
+        combined [inputs | outputs] value array.
+        """
+        n_inputs = len(self.inputs)
+        by_target = {rule['target']: rule for rule in self.rules}
+
+        # graphlib raises CycleError (a ValueError) for circular rules
+        sorter = TopologicalSorter({
+            rule['target']: [rule['from']] if 'from' in rule else [] for rule in self.rules
+        })
+        sorter.prepare()
+
+        self._levels = []
+        # Which inputs each target ultimately depends on
+        depends_on = np.zeros((n_inputs, len(self.outputs)), dtype=bool)
+
+        while sorter.is_active():
+            ready = sorter.get_ready()
+            batches = {}
+            for target in ready:
+                rule = by_target[target]
+                t = self._output_index[target]
+                if 'from' in rule:
+                    source = n_inputs + self._output_index[rule['from']]
+                    depends_on[:, t] = depends_on[:, self._output_index[rule['from']]]
+                else:
+                    source = self._input_index[rule['input']]
+                    depends_on[source, t] = True
+                targets, sources, operands = batches.setdefault(rule.get('op', 'copy'), ([], [], []))
+                targets.append(t)
+                sources.append(source)
+                operands.append(float(rule.get('operand', 0)))
+            sorter.done(*ready)
+
+            self._levels.append([
+                (RULE_OPERATIONS[op], np.array(targets), np.array(sources), np.array(operands))
+                for op, (targets, sources, operands) in batches.items()
+            ])
+
+        self._depends_on = depends_on
+
+    def _run(self, values, dirty=None):
+        n_inputs = len(self.inputs)
+        with np.errstate(all='ignore'):
+            for level in self._levels:
+                for ufunc, targets, sources, operands in level:
+                    if dirty is not None:
+                        keep = dirty[targets]
+                        if not keep.any():
+                            continue
+                        targets, sources, operands = targets[keep], sources[keep], operands[keep]
+                    source_values = values[..., sources]
+                    values[..., n_inputs + targets] = source_values if ufunc is None else ufunc(source_values, operands)
+
+    def evaluate(self, inputs):
+        """
+        Evaluate every rule over `inputs`, an array whose last axis follows
+        `self.inputs` (one tick, or one row per tick). Missing inputs are NaN
+        and propagate to the targets that depend on them.
+        """
+        inputs = np.asarray(inputs, dtype=np.float64)
+        values = np.empty(inputs.shape[:-1] + (len(self.inputs) + len(self.outputs),))
+        values[..., :len(self.inputs)] = inputs
+        self._run(values)
+        return values[..., len(self.inputs):]
+
+    def evaluate_frame(self, frame):
+        """
+        Evaluate a DataFrame of input columns (e.g. a price history) in one pass
+        """
+        inputs = frame.reindex(columns=self.inputs).to_numpy(dtype=np.float64)
+        return pd.DataFrame(self.evaluate(inputs), columns=self.outputs, index=frame.index)
+
+    def update(self, inputs):
+        """
+        Evaluate one tick incrementally against the previous one: only targets
+        downstream of a changed input are recomputed. `last_recomputed` holds
+        how many targets that was.
+        """
+        inputs = np.asarray(inputs, dtype=np.float64)
+        with self._lock:
+            if self._state is None:
+                self._state = np.empty(len(self.inputs) + len(self.outputs))
+                self._state[:len(self.inputs)] = inputs
+                self._run(self._state)
+                self.last_recomputed = len(self.outputs)
+            else:
+                previous = self._last_inputs
+                changed = ~((inputs == previous) | (np.isnan(inputs) & np.isnan(previous)))
+                dirty = self._depends_on[changed].any(axis=0)
+                self._state[:len(self.inputs)] = inputs
+                if dirty.any():
+                    self._run(self._state, dirty)
+                self.last_recomputed = int(dirty.sum())
+            self._last_inputs = inputs.copy()
+            return self._state[len(self.inputs):].copy()
+
+    def input_vector(self, values):
+        """
+        Input array from a {"<product>/<side>": value} mapping; missing or None values become NaN
+        """
+        vector = np.full(len(self.inputs), np.nan)
+        for name, value in values.items():
+            i = self._input_index.get(name)
+            if i is not None and value is not None:
+                vector[i] = value
+        return vector
+
+    def to_products(self, outputs):
+        """
+        One evaluated tick as {product: {side: value}}. NaN becomes None and
+        products without any value are left out.
+        """
+        products = {}
+        for column, value in zip(self.outputs, outputs):
+            product, side = split_column(column)
+            products.setdefault(product, {})[side] = None if np.isnan(value) else float(value)
+        return {
+            product: sides for product, sides in products.items()
+            if any(value is not None for value in sides.values())
+        }
+
+
+def load_rules(path=RULES_PATH):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+_engine = None
+_engine_mtime = None
+_engine_lock = threading.Lock()
+
+
+def get_pricing_engine(path=RULES_PATH):
+    """
+    Process-wide engine for the rules file. The file is re-read when its mtime
+    changes, so rules can be edited without restarting; if an edited file is
+    invalid the previous rules stay in effect.
+    """
+    global _engine, _engine_mtime
+    with _engine_lock:
+        mtime = os.stat(path).st_mtime_ns
+        if mtime != _engine_mtime:
+            try:
+                _engine = PricingEngine(load_rules(path))
+            except (OSError, ValueError) as e:
+                if _engine is None:
+                    raise
+                print(f"Invalid pricing rules in {path}, keeping the previous rules: {e}")
+            _engine_mtime = mtime
+        return _engine
@@ -0,0 +1,166 @@
+"""
+Offline replay of archived source pages.
+
+Runs a source's extraction and the price derivations over every saved HTML
+snapshot in a directory, in parallel, and writes one row per file (parsed
+rates, derived prices, timings, errors) to a columnar file. Used to check a
+markup change against an archive instead of the live site.
+
+Usage:
+    python replay.py snapshots/                              # kapalicarsi pages, all cores
+    python replay.py snapshots/ --output replay.parquet --workers 8
+    python replay.py snapshots/ --source canli_gram --pattern '*.html.gz'
+
+The output is Parquet when pyarrow is installed, CSV otherwise (or with
+--format csv). Exits with status 1 if any page failed to parse or lacked a
+valid rate for one of the source's required products.
+"""
+import argparse
+import fnmatch
+import gzip
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import app
+from exports import available_formats, iter_export_chunks
+
+
+def find_snapshots(directory, pattern='*.html'):
+    """
+    Files under `directory` matching `pattern`, sorted by path (archive order)
+    """
+    paths = []
+    for root, _, files in os.walk(directory):
+        paths.extend(os.path.join(root, name) for name in files if fnmatch.fnmatch(name, pattern))
+    return sorted(paths)
+
+
+def read_snapshot(path):
+    with open(path, 'rb') as f:
+        content = f.read()
+    return gzip.decompress(content) if path.endswith('.gz') else content
+
+
+def flatten_rates(prefix, rates):
+    return {
+        f'{prefix}:{product}/{side}': value
+        for product, sides in rates.items()
+        for side, value in sides.items()
+    }
+
+
+def replay_file(path, source='kapalicarsi'):
+    """
+    One result row for a saved page: parse and derive timings in ms, the
+    parsed rates and derived prices as 'parsed:<product>/<side>' and
+    'derived:<product>/<side>' columns, and the error if it failed.
+    """
+    row = {'file': path, 'modified_at': pd.Timestamp(os.path.getmtime(path), unit='s'), 'bytes': None,
+           'success': False, 'error': None, 'parse_ms': None, 'derive_ms': None, 'products': 0}
+    try:
+        content = read_snapshot(path)
+        row['bytes'] = len(content)
+        adapter = next(adapter for adapter in app.source_adapters() if adapter.name == source)
+
+        start = time.perf_counter()
+        data = adapter.parse(content)
+        row['parse_ms'] = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        prices = app.derive_gold_prices(data)
+        row['derive_ms'] = (time.perf_counter() - start) * 1000
+    except Exception as e:
+        row['error'] = f"{type(e).__name__}: {e}"
+        return row
+
+    row['success'] = adapter.is_good(data) and all(app.valid_rate(data[product]) for product in adapter.required)
+    if not row['success']:
+        row['error'] = "missing required products"
+    row['products'] = len(data)
+    row.update(flatten_rates('parsed', data))
+    row.update(flatten_rates('derived', prices))
+    return row
+
+
+def _replay_batch(paths, source):
+    # One task per batch of files keeps the inter-process traffic to a few messages
+    return [replay_file(path, source) for path in paths]
+
+
+def replay(paths, source='kapalicarsi', workers=None, batch_size=None):
+    """
+    Result rows of every file, in input order. Files are spread over a process
+    pool in batches; workers=1 runs in this process.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) < 2:
+        return _replay_batch(paths, source)
+
+    batch_size = batch_size or max(1, min(64, len(paths) // (workers * 4)))
+    batches = [paths[start:start + batch_size] for start in range(0, len(paths), batch_size)]
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for batch_rows in executor.map(_replay_batch, batches, [source] * len(batches)):
+            rows.extend(batch_rows)
+    return rows
+
+
+def results_frame(rows):
+    """
+    Rows as a DataFrame; the fixed columns first, then the price columns sorted
+    """
+    df = pd.DataFrame(rows)
+    fixed = ['file', 'modified_at', 'bytes', 'success', 'error', 'parse_ms', 'derive_ms', 'products']
+    return df[fixed + sorted(column for column in df.columns if column not in fixed)]
+
+
+def write_results(df, path, fmt):
+    with open(path, 'wb') as f:
+        for chunk in iter_export_chunks(df, fmt):
+            f.write(chunk)
+
+
+def main():
+    formats = [fmt for fmt in ('parquet', 'csv') if fmt in available_formats()]
+    parser = argparse.ArgumentParser(description="Replay archived source pages through the extraction")
+    parser.add_argument('directory', help="directory of saved HTML pages (searched recursively)")
+    parser.add_argument('--pattern', default='*.html', help="file name pattern, e.g. '*.html.gz' (default: *.html)")
+    parser.add_argument('--source', default='kapalicarsi',
+                        choices=[adapter.name for adapter in app.source_adapters()],
+                        help="source adapter to parse the pages with")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="worker processes (1 = no pool)")
+    parser.add_argument('--format', choices=formats, default=formats[0],
+                        help=f"output format (default: {formats[0]})")
+    parser.add_argument('--output', help="results file (default: replay_results.<format>)")
+    args = parser.parse_args()
+
+    paths = find_snapshots(args.directory, args.pattern)
+    if not paths:
+        print(f"No files matching {args.pattern!r} in {args.directory}")
+        sys.exit(1)
+
+    started = time.perf_counter()
+    df = results_frame(replay(paths, args.source, args.workers))
+    elapsed = time.perf_counter() - started
+
+    output = args.output or f'replay_results.{args.format}'
+    write_results(df, output, args.format)
+
+    failed = df[~df['success']]
+    print(f"Replayed {len(df):,} files with {args.workers} worker(s) in {elapsed:.2f}s "
+          f"({len(df) / elapsed:,.0f} files/s); parse p50 {df['parse_ms'].median():.1f} ms, "
+          f"p99 {df['parse_ms'].quantile(0.99):.1f} ms")
+    print(f"Wrote {output}")
+    if len(failed):
+        print(f"{len(failed):,} file(s) failed:")
+        for path, error in failed[['file', 'error']].head(10).itertuples(index=False):
+            print(f"  {path}: {error}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+"""
+Resilient calls to upstream price sources.
+
+Each source gets jittered retries, a hedged second request when the first is
+slow, a circuit breaker and a last-known-good value, all inside a latency
+budget:
+
+    source = get_source('kapalicarsi', fetch, budget=5, hedge_after=1)
+    result = source.call()      # never blocks much longer than the budget
+    result.value, result.stale, result.fetched_at, result.error
+
+Sources live in this module so they keep their breaker state and last good
+value across Streamlit reruns.
+"""
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from metrics import counter, gauge
+
+SOURCE_RETRIES = counter('source_retries_total', "Retried upstream source calls", ['source'])
+SOURCE_HEDGES = counter('source_hedged_requests_total', "Hedged second requests sent because the first was slow", ['source'])
+SOURCE_STALE = counter('source_stale_served_total', "Calls answered with the last known good value", ['source'])
+SOURCE_CIRCUIT_OPEN = gauge('source_circuit_open', "1 while the source's circuit breaker is open", ['source'])
+
+# Attempts run here so the caller can stop waiting at the deadline; an abandoned
+# attempt finishes on its own, bounded by its request timeout
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='source')
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failed calls and rejects calls
+    for `reset_timeout` seconds. Then a single probe call is let through
+    (half-open): success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self._failures = 0
+        self._opened_at = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == 'half_open' or self._failures >= self.failure_threshold:
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+
+
+class SourceResult:
+    """
+    Outcome of a source call. `value` is None only when the source failed and
+    there is no earlier good value; `stale` is True when `value` is that
+    earlier value, fetched at `fetched_at` (epoch seconds).
+    """
+
+    def __init__(self, value, stale=False, fetched_at=None, error=None):
+        self.value = value
+        self.stale = stale
+        self.fetched_at = fetched_at
+        self.error = error
+
+
+class ResilientSource:
+    """
+    Wraps `fetch(timeout=...)`, which returns a value or raises. A value for
+    which `is_good` is False counts as a failure.
+    """
+
+    def __init__(self, name, fetch, budget=5.0, retries=2, backoff=0.2, hedge_after=1.0,
+                 is_good=None, breaker=None):
+        self.name = name
+        self.fetch = fetch
+        self.budget = budget
+        self.retries = retries
+        self.backoff = backoff
+        self.hedge_after = hedge_after
+        self.is_good = is_good or (lambda value: value is not None)
+        self.breaker = breaker or CircuitBreaker()
+
+        self._lock = threading.Lock()
+        self._last_good = None
+        self._last_good_at = None
+        SOURCE_CIRCUIT_OPEN.set(0, source=name)
+
+    def call(self, budget=None):
+        """
+        Fetch within the latency budget, falling back to the last good value
+        """
+        deadline = time.monotonic() + (self.budget if budget is None else budget)
+
+        if not self.breaker.allow():
+            return self._fallback("circuit open")
+
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                # Full jitter: spread retries from many callers over the backoff window
+                delay = random.uniform(0, self.backoff * 2 ** (attempt - 1))
+                if time.monotonic() + delay >= deadline:
+                    break
+                time.sleep(delay)
+                SOURCE_RETRIES.inc(source=self.name)
+            try:
+                value = self._hedged(deadline)
+            except Exception as e:
+                error = e
+                if isinstance(e, TimeoutError):
+                    break
+                continue
+
+            self.breaker.record_success()
+            SOURCE_CIRCUIT_OPEN.set(0, source=self.name)
+            with self._lock:
+                self._last_good = value
+                self._last_good_at = time.time()
+            return SourceResult(value, fetched_at=self._last_good_at)
+
+        self.breaker.record_failure()
+        SOURCE_CIRCUIT_OPEN.set(int(self.breaker.state == 'open'), source=self.name)
+        return self._fallback(str(error) if error else "latency budget exceeded")
+
+    def _hedged(self, deadline):
+        """
+        One logical attempt: a second identical request is started if the first
+        has not answered within `hedge_after`; the first good answer wins
+        """
+        pending = {_executor.submit(self._attempt, deadline)}
+        hedged = self.hedge_after is None
+        error = None
+
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("latency budget exceeded")
+            timeout = remaining if hedged else min(self.hedge_after, remaining)
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+
+            if not hedged and pending:
+                pending.add(_executor.submit(self._attempt, deadline))
+                SOURCE_HEDGES.inc(source=self.name)
+                hedged = True
+
+        raise error
+
+    def _attempt(self, deadline):
+        value = self.fetch(timeout=max(0.1, deadline - time.monotonic()))
+        if not self.is_good(value):
+            raise ValueError(f"{self.name}: invalid response")
+        return value
+
+    def _fallback(self, error):
+        with self._lock:
+            value, fetched_at = self._last_good, self._last_good_at
+        if value is None:
+            return SourceResult(None, error=error)
+        SOURCE_STALE.inc(source=self.name)
+        return SourceResult(value, stale=True, fetched_at=fetched_at, error=error)
+
+
+_sources = {}
+_sources_lock = threading.Lock()
+
+
+def get_source(name, fetch, **options):
+    """
+    Process-wide ResilientSource for `name`, created on first use with `options`
+    """
+    with _sources_lock:
+        source = _sources.get(name)
+        if source is None:
+            source = _sources[name] = ResilientSource(name, fetch, **options)
+        return source
@@ -0,0 +1,96 @@
+"""
+In-process request coalescing ("single flight").
+
+    SOURCE_FLIGHTS = get_flight('source')
+    result = SOURCE_FLIGHTS.do(url, fetch_and_parse, url)
+
+While a call for a key is running, later calls with the same key do not start
+their own; they wait for the running one and get its result (or its
+exception). Once it finishes the key is free again, so nothing is cached:
+this only removes duplicate work that overlaps in time, e.g. every session
+refreshing the same source at once.
+"""
+import threading
+
+from metrics import counter, gauge
+
+SINGLEFLIGHT_CALLS = counter(
+    'singleflight_calls_total',
+    "Coalesced call groups: calls that ran (leader) or waited for an identical call in flight (coalesced)",
+    ['group', 'result']
+)
+SINGLEFLIGHT_IN_FLIGHT = gauge('singleflight_in_flight', "Keys with a call currently running", ['group'])
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time; concurrent callers share its outcome.
+    The shared value is the same object for every caller and must not be mutated.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        SINGLEFLIGHT_IN_FLIGHT.set_function(self.in_flight, group=name)
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+    def do(self, key, function, *args, **kwargs):
+        """
+        `function(*args, **kwargs)`, or the outcome of the call already running for `key`
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            SINGLEFLIGHT_CALLS.inc(group=self.name, result='coalesced')
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        SINGLEFLIGHT_CALLS.inc(group=self.name, result='leader')
+        try:
+            call.value = function(*args, **kwargs)
+            return call.value
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def coalesced(self):
+        """
+        Calls so far that were answered by another caller's call
+        """
+        return SINGLEFLIGHT_CALLS.value(group=self.name, result='coalesced')
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def get_flight(name):
+    """
+    Process-wide SingleFlight group `name`, shared across Streamlit reruns
+    """
+    with _flights_lock:
+        flight = _flights.get(name)
+        if flight is None:
+            flight = _flights[name] = SingleFlight(name)
+        return flight
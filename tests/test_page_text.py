@@ -0,0 +1,55 @@
+"""
+Page-text price fallback: linear scaling and no silent truncation on large pages.
+"""
+import time
+
+import app
+
+PRICES = "Has Altın 4250.10 4262.35 Çeyrek Altın 6757.66 6900.00 Gram Altın 4276.41 4290.00 Cumhuriyet Altın 28120.00 28520.00"
+
+
+def adversarial_text(size):
+    # Labels, "ata"-like words and lone numbers but no price pairs
+    chunk = 'Çeyrek Altın ata data Hatay katalog 12 Has Altın 7 Gram Altın '
+    return (chunk * (size // len(chunk) + 1))[:size]
+
+
+def scan_seconds(text, repeat=2):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.thread_time()
+        app.extract_prices_from_page_text(text, float('inf'))
+        best = min(best, time.thread_time() - start)
+    return best
+
+
+def test_scan_time_per_byte_is_flat():
+    small, large = 1_000_000, 4_000_000
+    per_byte_small = scan_seconds(adversarial_text(small)) / small
+    per_byte_large = scan_seconds(adversarial_text(large)) / large
+    assert per_byte_large < 2 * per_byte_small, (per_byte_small * 1e9, per_byte_large * 1e9)
+
+
+def test_large_page_is_scanned_to_the_end():
+    filler = '<p>Piyasa yorumu: altın fiyatları 12 ayda %8 arttı, ons 2.350 dolar civarında.</p>\n'
+    html = ('<html><body>' + filler * (1_200_000 // len(filler))
+            + f'<div>{PRICES}</div></body></html>')
+    assert len(html.encode('utf-8')) > 1_000_000
+
+    truncated = app.PAGE_TEXT_SCAN_TRUNCATED.value()
+    prices = app._parse_kapalicarsi_page_text(html)
+
+    assert app.PAGE_TEXT_SCAN_TRUNCATED.value() == truncated
+    assert prices == {
+        'Has Altın': {'Alış': 4250.10, 'Satış': 4262.35},
+        'Çeyrek Altın': {'Alış': 6757.66, 'Satış': 6900.00},
+        'Gram Altın': {'Alış': 4276.41, 'Satış': 4290.00},
+        'Cumhuriyet Altın': {'Alış': 28120.00, 'Satış': 28520.00},
+    }
+
+
+def test_budget_stops_the_scan_and_is_counted():
+    truncated = app.PAGE_TEXT_SCAN_TRUNCATED.value()
+    prices = app.extract_prices_from_page_text(adversarial_text(2_000_000) + PRICES, cpu_budget=0)
+    assert prices == {}
+    assert app.PAGE_TEXT_SCAN_TRUNCATED.value() == truncated + 1
@@ -0,0 +1,70 @@
+"""
+Price API: strong ETag tied to the body bytes, integer max-age, 304 revalidation.
+"""
+import urllib.error
+import urllib.request
+
+import pytest
+
+from price_api import PriceApi, serve_price_api
+
+PRICES = {'Çeyrek Altın': {'Alış': 6757.66, 'Satış': 6900.0}}
+
+
+def snapshot(fetched_at, prices=PRICES, stale=None):
+    return {'fetched_at': fetched_at, 'prices': prices, 'stale': stale or {}}
+
+
+def payload(snapshot):
+    return {'prices': snapshot['prices'], 'stale': snapshot['stale']}
+
+
+def served(snapshots):
+    current = iter(snapshots)
+    api = PriceApi(lambda: next(current), payload)
+    return [api.current() for _ in snapshots]
+
+
+def test_etag_changes_exactly_when_the_body_changes():
+    other_prices = {'Çeyrek Altın': {'Alış': 6757.66, 'Satış': 6905.0}}
+    responses = served([
+        snapshot(1000.0),
+        snapshot(1030.0),
+        snapshot(1060.0, other_prices),
+        snapshot(1090.0, other_prices, stale={'canli_gram': 1050.0}),
+        snapshot(1120.0),
+    ])
+
+    for (body, etag, _), (next_body, next_etag, _) in zip(responses, responses[1:]):
+        assert (body == next_body) == (etag == next_etag)
+    assert [etag for _, etag, _ in responses].count(responses[0][1]) == 3
+    assert all(not etag.startswith('W/') for _, etag, _ in responses)
+
+
+def test_snapshot_time_is_sent_as_headers_not_in_the_body():
+    body, _, headers = served([snapshot(1000.0)])[0]
+    assert b'fetched_at' not in body
+    assert headers['X-Fetched-At'] == '1000.0'
+    assert headers['Last-Modified'] == 'Thu, 01 Jan 1970 00:16:40 GMT'
+
+
+@pytest.fixture
+def server():
+    api = PriceApi(lambda: snapshot(1000.0), payload, max_age=2.0)
+    server = serve_price_api(api, port=0)
+    yield f'http://127.0.0.1:{server.server_address[1]}/prices'
+    server.shutdown()
+    server.server_close()
+
+
+def test_cache_control_is_integer_and_etag_revalidates(server):
+    with urllib.request.urlopen(server) as response:
+        assert response.headers['Cache-Control'] == 'public, max-age=2'
+        etag = response.headers['ETag']
+
+    request = urllib.request.Request(server, headers={'If-None-Match': etag})
+    with pytest.raises(urllib.error.HTTPError) as not_modified:
+        urllib.request.urlopen(request)
+    assert not_modified.value.code == 304
+    assert not_modified.value.headers['ETag'] == etag
+    assert not_modified.value.headers['Cache-Control'] == 'public, max-age=2'
@@ -0,0 +1,125 @@
+"""
+Circuit breaker states and last-known-good fallback of resilient sources.
+"""
+import threading
+import time
+
+import pytest
+
+import resilience
+from resilience import CircuitBreaker, ResilientSource
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(resilience.time, 'monotonic', clock)
+    return clock
+
+
+def test_breaker_opens_after_three_failures_and_half_opens_after_cooldown(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == 'closed' and breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+
+    clock.now += 29.9
+    assert not breaker.allow()
+
+    clock.now += 0.1
+    assert breaker.allow()
+    assert breaker.state == 'half_open'
+    # Only the one probe gets through while half-open
+    assert not breaker.allow()
+
+
+def test_half_open_probe_closes_or_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(3):
+        breaker.record_failure()
+
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open' and not breaker.allow()
+
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.allow()
+
+
+def test_open_breaker_serves_last_good_without_calling_upstream():
+    calls = []
+    failing = False
+
+    def fetch(timeout):
+        calls.append(timeout)
+        if failing:
+            raise ConnectionError("upstream down")
+        return {'Has Altın': 4250.1}
+
+    source = ResilientSource('test-breaker', fetch, budget=2, retries=0, hedge_after=None,
+                             breaker=CircuitBreaker(failure_threshold=3, reset_timeout=60))
+    assert source.call().value == {'Has Altın': 4250.1}
+
+    failing = True
+    for _ in range(3):
+        result = source.call()
+        assert result.stale and result.value == {'Has Altın': 4250.1}
+    assert source.breaker.state == 'open'
+
+    calls.clear()
+    result = source.call()
+    assert calls == []
+    assert result.stale and result.error == "circuit open"
+
+
+def test_hung_source_returns_stale_value_within_budget():
+    hung = threading.Event()
+    release = threading.Event()
+
+    def fetch(timeout):
+        if hung.is_set():
+            release.wait(10)
+        return {'Has Altın': 4250.1}
+
+    source = ResilientSource('test-hung', fetch, budget=0.3, retries=2, hedge_after=0.1)
+    first = source.call()
+    assert not first.stale
+
+    hung.set()
+    try:
+        start = time.monotonic()
+        result = source.call()
+        elapsed = time.monotonic() - start
+    finally:
+        release.set()
+
+    assert result.stale
+    assert result.value == {'Has Altın': 4250.1}
+    assert result.fetched_at == first.fetched_at
+    assert result.error == "latency budget exceeded"
+    # The budget plus scheduling slack; the hung attempts are abandoned, not awaited
+    assert elapsed < 0.3 + 0.5
+
+
+def test_bad_response_counts_as_failure():
+    source = ResilientSource('test-bad', lambda timeout: {}, budget=1, retries=0, hedge_after=None,
+                             is_good=bool)
+    result = source.call()
+    assert result.value is None and not result.stale
+    assert "invalid response" in result.error
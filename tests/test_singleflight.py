@@ -0,0 +1,84 @@
+"""
+Request coalescing: concurrent identical calls share one upstream call.
+"""
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def run_concurrently(flight, key, function, callers):
+    # Starts `callers` threads on flight.do and releases the leader's call only
+    # once all the others are waiting on it
+    results = [None] * callers
+    errors = [None] * callers
+    coalesced_before = flight.coalesced()
+
+    def caller(index):
+        try:
+            results[index] = flight.do(key, function)
+        except Exception as e:
+            errors[index] = e
+
+    threads = [threading.Thread(target=caller, args=(index,)) for index in range(callers)]
+    for thread in threads:
+        thread.start()
+    wait_until(lambda: flight.coalesced() - coalesced_before == callers - 1)
+    return threads, results, errors
+
+
+def test_concurrent_callers_make_one_upstream_call():
+    flight = SingleFlight('test-coalesce')
+    release = threading.Event()
+    calls = []
+
+    def upstream():
+        calls.append(1)
+        release.wait(5)
+        return {'Has Altın': 4250.1}
+
+    threads, results, errors = run_concurrently(flight, 'kapalicarsi', upstream, 8)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert errors == [None] * 8
+    assert all(result is results[0] for result in results)
+    assert flight.in_flight() == 0
+
+
+def test_error_is_shared_by_every_waiter():
+    flight = SingleFlight('test-error')
+    release = threading.Event()
+
+    def upstream():
+        release.wait(5)
+        raise ConnectionError("upstream down")
+
+    threads, results, errors = run_concurrently(flight, 'kapalicarsi', upstream, 4)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert all(isinstance(error, ConnectionError) for error in errors)
+
+
+def test_nothing_is_cached_after_the_call():
+    flight = SingleFlight('test-no-cache')
+    values = iter([1, 2])
+
+    assert flight.do('key', lambda: next(values)) == 1
+    assert flight.do('key', lambda: next(values)) == 2
+    with pytest.raises(StopIteration):
+        flight.do('key', lambda: next(values))
+    assert flight.in_flight() == 0
@@ -0,0 +1,40 @@
+"""
+Streaming text parser: numbers split across chunks, and linear time on long digit runs.
+"""
+import time
+
+import app
+
+
+def feed_chunks(chunks):
+    parser = app.StreamingTextParser()
+    pieces = []
+    for chunk in chunks:
+        parser.feed(chunk)
+        pieces.append(parser.take_text())
+    parser.close()
+    pieces.append(parser.take_text(final=True))
+    return pieces
+
+
+def test_number_split_across_chunks_is_held_back():
+    pieces = feed_chunks(['<p>Has Altın 4.25', '0,10 TL</p>'])
+    assert pieces[0] == 'Has Altın '
+    assert ''.join(pieces) == 'Has Altın 4.250,10 TL'
+
+
+def test_long_digit_run_is_linear():
+    for size in (40_000, 400_000):
+        start = time.perf_counter()
+        pieces = feed_chunks(['<p>' + '7' * size + 'a</p>'])
+        elapsed = time.perf_counter() - start
+        assert ''.join(pieces) == '7' * size + 'a'
+        # The regex version took 18 s for 40k digits
+        assert elapsed < 0.5, (size, elapsed)
+
+
+def test_digit_run_spanning_many_chunks_is_not_held_forever():
+    chunk = '1234567890' * 6400
+    pieces = feed_chunks(['<p>'] + [chunk] * 50 + ['</p>'])
+    assert ''.join(pieces) == chunk * 50
+    assert max(len(piece) for piece in pieces) <= len(chunk) + app.NUMBER_TAIL_MAX
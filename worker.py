@@ -0,0 +1,91 @@
+"""
+Headless gold price ingestion worker.
+
+Owns all scraping and derivations on a fixed schedule and publishes the result
+as an atomically replaced snapshot file. Streamlit replicas started with the
+same GOLD_SNAPSHOT_PATH only read that file and do no network I/O.
+
+Usage:
+    python worker.py --output /shared/gold_snapshot.json --interval 30
+    python worker.py --output /shared/gold_snapshot.json --api-port 8600   # also serve GET /prices
+    GOLD_SNAPSHOT_PATH=/shared/gold_snapshot.json streamlit run app.py
+"""
+import argparse
+import os
+import time
+
+import app
+from metrics import serve_metrics
+from price_api import PriceApi, serve_price_api
+from price_cache import SnapshotFile
+from price_history import PriceHistory
+
+
+def ingest_once(snapshot_file, history=None):
+    """
+    Fetch all sources, derive every product and publish the snapshot.
+    A failed fetch leaves the previously published snapshot in place.
+    """
+    snapshot = app.fetch_gold_snapshot()
+
+    if not snapshot['kapali']['success']:
+        print(f"Fetch failed, keeping the last published snapshot: {snapshot['kapali']['error']}")
+        return False
+
+    snapshot['prices'] = app.derive_gold_prices(snapshot['kapali']['data'], snapshot['canli_gram_satis'])
+    snapshot_file.write(snapshot)
+    app.record_gold_snapshot(snapshot, history)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gold price ingestion worker")
+    parser.add_argument('--output', default=os.environ.get('GOLD_SNAPSHOT_PATH', 'gold_snapshot.json'),
+                        help="snapshot file the Streamlit replicas read (GOLD_SNAPSHOT_PATH)")
+    parser.add_argument('--interval', type=float, default=app.GOLD_PRICE_TTL,
+                        help="seconds between ingestion runs (GOLD_PRICE_TTL)")
+    parser.add_argument('--history', default=app.PRICE_HISTORY_PATH,
+                        help="SQLite price history file to record to; off by default (PRICE_HISTORY_PATH)")
+    parser.add_argument('--api-port', type=int, default=int(os.environ.get('GOLD_API_PORT') or 0),
+                        help="also serve the published prices as JSON on this port, 0 to disable (GOLD_API_PORT)")
+    parser.add_argument('--metrics-port', type=int, default=int(os.environ.get('METRICS_PORT') or 0),
+                        help="serve Prometheus metrics on this port, 0 to disable (METRICS_PORT)")
+    parser.add_argument('--once', action='store_true', help="run a single ingestion and exit")
+    args = parser.parse_args()
+
+    snapshot_file = SnapshotFile(args.output)
+    history = PriceHistory(args.history) if args.history else None
+    if args.api_port and not args.once:
+        api = PriceApi(snapshot_file.read, app.gold_price_payload, max_age=args.interval)
+        serve_price_api(api, app.GOLD_API_HOST, args.api_port)
+        print(f"Serving prices on http://{app.GOLD_API_HOST}:{args.api_port}/prices")
+    if args.metrics_port and not args.once:
+        app.SNAPSHOT_AGE.set_function(lambda: app.snapshot_age(snapshot_file.read()))
+        serve_metrics(app.METRICS_HOST, args.metrics_port)
+        print(f"Serving metrics on http://{app.METRICS_HOST}:{args.metrics_port}/metrics")
+
+    try:
+        next_run = time.monotonic()
+        while True:
+            started = time.monotonic()
+            if ingest_once(snapshot_file, history):
+                print(f"Published snapshot to {args.output} in {time.monotonic() - started:.2f}s")
+            if args.once:
+                break
+
+            # Fixed-rate schedule; after an overrun start counting again from now
+            next_run += args.interval
+            delay = next_run - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_run = time.monotonic()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if history is not None:
+            history.close()
+
+
+if __name__ == '__main__':
+    main()